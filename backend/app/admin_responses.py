@@ -0,0 +1,27 @@
+"""
+Admin responses on complaints
+Each response is an append-only ComplaintMessage row with kind 'admin_response'.
+`Complaint.admin_response` holds only the latest one, labelled with the admin's role
+("[CM-Admin]: ..."), so list views can show it without reading the messages table
+and the complaint row no longer grows with every reply.
+"""
+from sqlalchemy.orm import Session
+
+from app.models import Complaint, ComplaintMessage, User
+
+ADMIN_RESPONSE = "admin_response"
+C_ADMIN_LABEL = "C-Admin"
+CM_ADMIN_LABEL = "CM-Admin"
+
+
+def format_admin_response(label: str, text: str) -> str:
+    return f"[{label}]: {text}"
+
+
+def record_admin_response(db: Session, complaint: Complaint, admin: User, label: str, text: str) -> ComplaintMessage:
+    """Add the response message and make it the complaint's latest reply. The caller commits."""
+    message = ComplaintMessage(complaint_id=complaint.id, sender_id=admin.id, message=text, kind=ADMIN_RESPONSE)
+    db.add(message)
+    complaint.admin_response = format_admin_response(label, text)  # type: ignore
+    complaint.updated_by_admin = admin.email  # type: ignore
+    return message
@@ -0,0 +1,144 @@
+"""
+Voice recording processing (ffmpeg / ffprobe)
+- probe_audio(): container, codec, duration and sample rate of an upload. The create
+  endpoint uses it to reject files that are not audio or are too long.
+- transcode_voice(): background task run after the complaint is saved. It re-encodes
+  the recording to mono Opus in an Ogg container and points `voice_path` at the new
+  file. The original upload is deleted unless the user asked to keep it, in which case
+  its path is kept in `voice_original_path`.
+Without ffmpeg on PATH (or with VOICE_TRANSCODE_ENABLED off) recordings are stored
+exactly as uploaded, as before.
+"""
+import json
+import logging
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.lifecycle import background_job
+from app.models import Complaint
+from app.storage import key_from_url, storage, temp_dir, url_for_key
+
+logger = logging.getLogger("app.audio")
+
+FFMPEG = shutil.which(settings.FFMPEG_PATH)
+FFPROBE = shutil.which(settings.FFPROBE_PATH)
+PROBE_TIMEOUT_SECONDS = 30
+TRANSCODE_TIMEOUT_SECONDS = 300
+
+
+class AudioInfo(NamedTuple):
+    format_name: str
+    codec: str
+    duration: Optional[float]
+    sample_rate: Optional[int]
+
+
+def transcoding_available() -> bool:
+    return settings.VOICE_TRANSCODE_ENABLED and FFMPEG is not None and FFPROBE is not None
+
+
+def probe_audio(path: Path) -> Optional[AudioInfo]:
+    """Inspect an audio file. Returns None when ffprobe is not installed.
+
+    Raises ValueError if the file has no readable audio stream.
+    """
+    if FFPROBE is None:
+        return None
+    result = subprocess.run(
+        [FFPROBE, "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "format=format_name,duration:stream=codec_name,sample_rate",
+         "-of", "json", str(path)],
+        capture_output=True, timeout=PROBE_TIMEOUT_SECONDS
+    )
+    if result.returncode != 0:
+        raise ValueError("Not a readable audio file")
+    data = json.loads(result.stdout or b"{}")
+    streams = data.get("streams") or []
+    if not streams:
+        raise ValueError("File has no audio stream")
+
+    stream, fmt = streams[0], data.get("format", {})
+    duration = fmt.get("duration")
+    sample_rate = stream.get("sample_rate")
+    return AudioInfo(
+        fmt.get("format_name", ""),
+        stream.get("codec_name", ""),
+        float(duration) if duration not in (None, "N/A") else None,
+        int(sample_rate) if sample_rate else None
+    )
+
+
+def _is_opus_ogg(info: AudioInfo) -> bool:
+    return info.codec == "opus" and "ogg" in info.format_name.split(",")
+
+
+def _transcode(source: Path, workdir: Path) -> Optional[Path]:
+    """Encode `source` to Opus/Ogg in `workdir`; returns the new file or None on failure"""
+    target = workdir / "voice.ogg"
+    result = subprocess.run(
+        [FFMPEG, "-nostdin", "-v", "error", "-y", "-i", str(source),
+         "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", settings.VOICE_OPUS_BITRATE,
+         "-application", "voip", "-f", "ogg", str(target)],
+        capture_output=True, timeout=TRANSCODE_TIMEOUT_SECONDS
+    )
+    if result.returncode != 0:
+        logger.warning("ffmpeg failed for %s: %s", source, result.stderr.decode(errors="replace")[-500:])
+        return None
+    return target
+
+
+def transcoded_key(source_key: str) -> str:
+    # Never overwrite an existing key's bytes: media is served as immutable
+    source = PurePosixPath(source_key)
+    if source.suffix.lower() == ".ogg":
+        return str(source.with_name(f"{source.stem}.opus.ogg"))
+    return str(source.with_suffix(".ogg"))
+
+
+@background_job
+def transcode_voice(complaint_id: int, voice_url: str, keep_original: bool = False):
+    """Background task: swap a complaint's recording for its Opus/Ogg encoding"""
+    if not transcoding_available():
+        return
+    source_key = key_from_url(voice_url)
+    target_key = transcoded_key(source_key)
+    try:
+        with storage.local_copy(source_key) as source, tempfile.TemporaryDirectory(dir=temp_dir()) as workdir:
+            info = probe_audio(source)
+            if info is None or _is_opus_ogg(info):
+                return
+            encoded = _transcode(source, Path(workdir))
+            if encoded is None:
+                return
+            storage.save_file(target_key, encoded, "audio/ogg")
+    except (ValueError, subprocess.TimeoutExpired, OSError) as e:
+        logger.warning("Could not transcode %s: %s", voice_url, e)
+        return
+
+    new_url = url_for_key(target_key)
+    db = SessionLocal()
+    try:
+        # Only swap if the complaint still points at this upload; keep updated_at as is
+        updated = (
+            db.query(Complaint)
+            .filter(Complaint.id == complaint_id, Complaint.voice_path == voice_url)
+            .update({
+                Complaint.voice_path: new_url,
+                Complaint.voice_original_path: voice_url if keep_original else None,
+                Complaint.updated_at: Complaint.updated_at
+            }, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    if not updated:
+        # Complaint deleted (or recording replaced) while we were encoding
+        storage.delete(target_key)
+    elif not keep_original:
+        storage.delete(source_key)
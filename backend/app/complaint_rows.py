@@ -0,0 +1,247 @@
+"""
+Complaint rows and response mapping
+Every endpoint that returns complaints selects the same flat set of columns
+(complaint + department name + author) straight from SQL, and turns each row into
+the response dict through the functions below. No ORM objects or lazy loads are
+involved in list endpoints.
+
+List endpoints select only a preview of the long text columns (description and the
+latest admin_response) and accept `fields=` to return a subset of keys; text
+columns left out of `fields` are not selected at all. Only the single-complaint
+responses carry the full text.
+"""
+import functools
+from datetime import datetime
+from typing import AbstractSet, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, status as http_status
+from sqlalchemy import bindparam, func, null, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.media import media_url
+from app.models import Complaint, ComplaintStatus, Department, User
+from app.schemas import AdminComplaintPayload, ComplaintPayload
+
+
+class ComplaintRow(NamedTuple):
+    """One complaint as selected by `complaint_rows_query()` (column order matters)"""
+    id: int
+    user_id: int
+    department: Optional[str]
+    district: Optional[str]
+    subcategory: Optional[str]
+    title: str
+    description: str
+    location: Optional[str]
+    status: ComplaintStatus
+    admin_response: Optional[str]
+    image_path: Optional[str]
+    voice_path: Optional[str]
+    voice_duration: Optional[float]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    user_name: Optional[str]
+    user_profile_picture: Optional[str]
+    user_email: Optional[str]
+    user_phone: Optional[str]
+
+    @classmethod
+    def from_complaint(cls, complaint: Complaint, department: Optional[str], user: Optional[User]) -> "ComplaintRow":
+        """Build a row from ORM objects already in hand (after a create or update)"""
+        return cls(
+            complaint.id, complaint.user_id, department, complaint.district, complaint.subcategory,
+            complaint.title, complaint.description, complaint.location, complaint.status,
+            complaint.admin_response, complaint.image_path, complaint.voice_path,
+            complaint.voice_duration_seconds, complaint.created_at, complaint.updated_at,
+            user.name if user else None, user.profile_picture if user else None,
+            user.email if user else None, user.phone if user else None
+        )
+
+
+COMPLAINT_ROW_COLUMNS = (
+    Complaint.id,
+    Complaint.user_id,
+    Department.name,
+    Complaint.district,
+    Complaint.subcategory,
+    Complaint.title,
+    Complaint.description,
+    Complaint.location,
+    Complaint.status,
+    Complaint.admin_response,
+    Complaint.image_path,
+    Complaint.voice_path,
+    Complaint.voice_duration_seconds,
+    Complaint.created_at,
+    Complaint.updated_at,
+    User.name,
+    User.profile_picture,
+    User.email,
+    User.phone,
+)
+
+# Enum -> response string, resolved once instead of per row
+_STATUS_TEXT = {s: s.value for s in ComplaintStatus}
+_STATUS_TEXT.update({s.value: s.value for s in ComplaintStatus})
+
+
+# Columns list views shorten to a preview (or skip when not in `fields`)
+LONG_TEXT_FIELDS = ("description", "admin_response")
+
+COMPLAINT_FIELDS = frozenset(ComplaintPayload.__annotations__)
+ADMIN_COMPLAINT_FIELDS = frozenset(AdminComplaintPayload.__annotations__)
+
+
+def parse_fields(fields: Optional[str], allowed: AbstractSet[str]) -> Optional[FrozenSet[str]]:
+    """`fields=id,title,status` query value -> set of keys (None means all)"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - allowed
+    if unknown:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    names.add("id")
+    if names.intersection(LONG_TEXT_FIELDS):
+        names.add("truncated")
+    return frozenset(names)
+
+
+def complaint_rows_query(preview: bool = False, fields: Optional[AbstractSet[str]] = None):
+    """SELECT of ComplaintRow columns; add filters and ordering as needed.
+
+    With `preview`, long text columns are cut in SQL to one character more than
+    COMPLAINT_PREVIEW_CHARS (so truncation can be detected); with `fields`, long
+    text columns not asked for are replaced by NULL.
+    """
+    columns = list(COMPLAINT_ROW_COLUMNS)
+    if preview or fields is not None:
+        for name in LONG_TEXT_FIELDS:
+            index = ComplaintRow._fields.index(name)
+            if fields is not None and name not in fields:
+                columns[index] = null().label(name)
+            elif preview:
+                columns[index] = func.substr(columns[index], 1, settings.COMPLAINT_PREVIEW_CHARS + 1).label(name)
+    return (
+        select(*columns)
+        .select_from(Complaint)
+        .outerjoin(Department, Department.id == Complaint.department_id)
+        .outerjoin(User, User.id == Complaint.user_id)
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def complaint_list_query(preview: bool = False, fields: Optional[FrozenSet[str]] = None,
+                         filters: Tuple[str, ...] = (), newest_first: bool = True):
+    """complaint_rows_query() with `Complaint.<name> == :<name>` for each of `filters`.
+
+    Built once per combination: the same statement object is reused, so SQLAlchemy
+    computes its cache key once and finds the compiled SQL without rebuilding it
+    (see app/queries.py). Pass the filter values as execute() parameters.
+    """
+    query = complaint_rows_query(preview, fields)
+    for name in filters:
+        query = query.where(getattr(Complaint, name) == bindparam(name))
+    if newest_first:
+        query = query.order_by(Complaint.created_at.desc())
+    return query
+
+
+@functools.lru_cache(maxsize=64)
+def user_feed_query(fields: Optional[FrozenSet[str]] = None, after_cursor: bool = False):
+    """One page of a user's complaints (previews), newest first, keyset-paginated.
+
+    Parameters: user_id, limit and, with `after_cursor`, the (cursor_created_at,
+    cursor_id) of the last row of the previous page. Served by ix_complaints_user_created.
+    """
+    query = complaint_rows_query(True, fields).where(Complaint.user_id == bindparam("user_id"))
+    if after_cursor:
+        query = query.where(
+            tuple_(Complaint.created_at, Complaint.id) < tuple_(bindparam("cursor_created_at"), bindparam("cursor_id"))
+        )
+    return query.order_by(Complaint.created_at.desc(), Complaint.id.desc()).limit(bindparam("limit"))
+
+
+def fetch_complaint_row(db: Session, complaint_id: int) -> Optional[ComplaintRow]:
+    row = db.execute(complaint_list_query(filters=("id",), newest_first=False), {"id": complaint_id}).first()
+    return ComplaintRow._make(row) if row is not None else None
+
+
+def to_complaint_payload(row: Iterable) -> ComplaintPayload:
+    (cid, user_id, department, district, subcategory, title, description, location, status,
+     admin_response, image_path, voice_path, voice_duration, created_at, updated_at,
+     user_name, user_picture, _user_email, _user_phone) = row
+    return {
+        "id": cid,
+        "user_id": user_id,
+        "department": department,
+        "district": district,
+        "subcategory": subcategory,
+        "title": title,
+        "description": description,
+        "location": location,
+        "status": _STATUS_TEXT.get(status, str(status)),
+        "admin_response": admin_response,
+        "image_url": media_url(image_path),
+        "voice_url": media_url(voice_path),
+        "voice_duration_seconds": voice_duration,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "user_name": user_name if user_name is not None else "Anonymous",
+        "user_profile_picture": media_url(user_picture),
+        "truncated": False
+    }
+
+
+def to_admin_complaint_payload(row: Iterable) -> AdminComplaintPayload:
+    (cid, user_id, department, district, subcategory, title, description, location, status,
+     admin_response, image_path, voice_path, voice_duration, created_at, updated_at,
+     user_name, user_picture, user_email, user_phone) = row
+    has_user = user_email is not None
+    return {
+        "id": cid,
+        "user_id": user_id,
+        "department": department,
+        "district": district,
+        "subcategory": subcategory,
+        "title": title,
+        "description": description,
+        "location": location,
+        "status": _STATUS_TEXT.get(status, str(status)),
+        "admin_response": admin_response,
+        "image_url": media_url(image_path),
+        "voice_url": media_url(voice_path),
+        "voice_duration_seconds": voice_duration,
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "user_name": user_name if has_user else "Deleted User",
+        "user_email": user_email if has_user else "N/A",
+        "user_phone": user_phone if has_user else "N/A",
+        "user_profile_picture": media_url(user_picture),
+        "truncated": False
+    }
+
+
+def _list_item(payload: dict, fields: Optional[AbstractSet[str]]) -> dict:
+    """Cut preview text to COMPLAINT_PREVIEW_CHARS and keep only `fields`"""
+    limit = settings.COMPLAINT_PREVIEW_CHARS
+    for name in LONG_TEXT_FIELDS:
+        text = payload[name]
+        if text is not None and len(text) > limit:
+            payload[name] = text[:limit].rstrip() + "…"
+            payload["truncated"] = True
+    if fields is None:
+        return payload
+    return {key: value for key, value in payload.items() if key in fields}
+
+
+def complaint_payloads(rows: Iterable, fields: Optional[AbstractSet[str]] = None) -> List[ComplaintPayload]:
+    """List view payloads for rows from complaint_rows_query(preview=True, fields=...)"""
+    return [_list_item(to_complaint_payload(row), fields) for row in rows]
+
+
+def admin_complaint_payloads(rows: Iterable, fields: Optional[AbstractSet[str]] = None) -> List[AdminComplaintPayload]:
+    return [_list_item(to_admin_complaint_payload(row), fields) for row in rows]
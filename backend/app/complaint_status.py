@@ -0,0 +1,72 @@
+"""
+Complaint status helpers
+Every code path that changes `Complaint.status` goes through here so that a
+matching `ComplaintStatusHistory` row is always written in the same transaction.
+
+Transitions are checked against TRANSITIONS using the status already loaded with
+the complaint, without reading it again. That is safe because the UPDATE is a
+compare-and-swap on `Complaint.version` (see models.py): if another admin changed
+the complaint since it was loaded, the commit fails with StaleDataError and the
+request gets 409 Conflict instead of a second, inconsistent history entry.
+"""
+from typing import Optional
+
+from fastapi import HTTPException, status as http_status
+from sqlalchemy.orm import Session
+
+from app.models import Complaint, ComplaintStatus, ComplaintStatusHistory
+
+# Allowed changes; new complaints always start as pending
+TRANSITIONS = {
+    ComplaintStatus.pending: frozenset({ComplaintStatus.in_progress, ComplaintStatus.solved}),
+    ComplaintStatus.in_progress: frozenset({ComplaintStatus.pending, ComplaintStatus.solved}),
+    ComplaintStatus.solved: frozenset({ComplaintStatus.in_progress}),  # reopen
+}
+
+CONFLICT_DETAIL = "Complaint was changed by someone else; reload it and try again"
+
+
+def can_transition(old_status: Optional[ComplaintStatus], new_status: ComplaintStatus) -> bool:
+    if old_status is None:
+        return new_status == ComplaintStatus.pending
+    return new_status in TRANSITIONS[old_status]
+
+
+def record_status_change(
+    db: Session,
+    complaint: Complaint,
+    new_status: ComplaintStatus,
+    changed_by: int,
+    note: Optional[str] = None,
+) -> ComplaintStatusHistory:
+    """Set the complaint's status and add the audit row. The caller commits.
+
+    A complaint that has not been flushed yet is treated as newly created, so its
+    history starts with `old_status=None`. Raises 400 for a transition that
+    TRANSITIONS does not allow.
+    """
+    old_status = None if complaint.id is None else complaint.status
+    if not can_transition(old_status, new_status):
+        current = old_status.value if old_status is not None else "new"
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot change status from {current} to {new_status.value}"
+        )
+
+    if complaint.id is None:
+        db.add(complaint)
+        db.flush()  # assign complaint.id for the history row
+
+    setattr(complaint, 'status', new_status)
+
+    # Add by foreign key rather than through `complaint.status_history`,
+    # which would lazy-load every previous entry first
+    history = ComplaintStatusHistory(
+        complaint_id=complaint.id,
+        old_status=old_status,
+        new_status=new_status,
+        changed_by=changed_by,
+        note=note
+    )
+    db.add(history)
+    return history
@@ -4,14 +4,25 @@ Database connection setup
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
+
+def _connect_args() -> dict:
+    # Server-side prepared statements are a psycopg 3 feature
+    if make_url(settings.DATABASE_URL).get_driver_name() == "psycopg":
+        return {"prepare_threshold": settings.DB_PREPARE_THRESHOLD}
+    return {}
+
+
 # Create database engine - PostgreSQL for production
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # Verify connections before use
+    query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+    connect_args=_connect_args(),
     echo=False  # Set to True for SQL query logging
 )
 
@@ -5,6 +5,8 @@ from typing import Optional, Any
 from jose import JWTError  # type: ignore
 from app.database import get_db
 from app.models import User
+from app.queries import user_by_email
+from app.registry import roles
 from app.security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -20,15 +22,20 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if not email:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = user_by_email(db, email)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
+def has_role(db: Session, user: User, *role_names: str) -> bool:
+    """Check the user's role_id against the role registry (no join, no lazy load)"""
+    return any(roles.id_for(db, name) == user.role_id for name in role_names)
+
+
 def require_roles(*allowed_roles: str):
-    def _checker(current_user: User = Depends(get_current_user)) -> User:
-        if current_user.role and current_user.role.name in allowed_roles:
+    def _checker(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> User:
+        if has_role(db, current_user, *allowed_roles):
             return current_user
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient privileges")
     return _checker
\ No newline at end of file
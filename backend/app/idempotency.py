@@ -0,0 +1,173 @@
+"""
+Idempotent complaint submission
+Clients send an `Idempotency-Key` header with POST /api/complaints/ and reuse it on
+retries. The first request claims the key (a committed row with complaint_id NULL)
+before doing any uploads; the complaint insert then fills in complaint_id in the same
+transaction. A retry with the same key:
+- after success: gets the original complaint back as a 201, nothing is redone
+- while the first request is still running: 409, retry later
+- with a different payload: 422
+If the first request fails, its claim is released so the retry can run normally.
+A claim whose worker died before it could release it (deploy, OOM, hard kill) is
+taken over by the next retry once it is IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS old.
+
+The optional near-duplicate check (DUPLICATE_WINDOW_SECONDS) catches retries that
+arrive without a key: same user, title and description within the window -> 409.
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Complaint, IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+DIGEST_CHUNK_SIZE = 1024 * 1024
+PURGE_INTERVAL_SECONDS = 300
+
+_last_purge = 0.0
+
+
+def request_fingerprint(parts: Iterable[Optional[str]]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(b"\x1f" + (part or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _file_digest(upload: UploadFile) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    upload.file.seek(0)
+    for chunk in iter(lambda: upload.file.read(DIGEST_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    upload.file.seek(0)
+    return digest.hexdigest()
+
+
+async def upload_digest(upload: UploadFile) -> str:
+    """Content hash of an uploaded file for request_fingerprint; the file is rewound"""
+    return f"{upload.filename}:{await run_in_threadpool(_file_digest, upload)}"
+
+
+def _cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+
+
+def _take_over_stale_claim(db: Session, user_id: int, key: str) -> bool:
+    """Restart the clock on an abandoned claim; False if another request got there first"""
+    now = datetime.utcnow()
+    taken = db.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.complaint_id.is_(None),
+            IdempotencyKey.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS)
+        )
+        .values(created_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return taken == 1
+
+
+def purge_expired(db: Session):
+    """Delete expired keys, at most once per PURGE_INTERVAL_SECONDS per process"""
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < _cutoff()))
+    db.commit()
+
+
+def claim_key(db: Session, user_id: int, key: str, fingerprint: str) -> Optional[int]:
+    """Claim `key` for a new submission.
+
+    Returns None if the caller should go ahead and create the complaint, or the id
+    of the complaint an earlier request with this key already created.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+        )
+    purge_expired(db)
+
+    for _ in range(2):
+        db.add(IdempotencyKey(user_id=user_id, key=key, request_hash=fingerprint))
+        try:
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+
+        existing = db.get(IdempotencyKey, (user_id, key))
+        if existing is None:
+            continue  # released in the meantime; try again
+        if existing.created_at < _cutoff():
+            # Expired but not purged yet: reuse the key for this request
+            db.delete(existing)
+            db.commit()
+            continue
+        if existing.request_hash != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        if existing.complaint_id is None:
+            if _take_over_stale_claim(db, user_id, key):
+                return None
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed",
+                headers={"Retry-After": "2"}
+            )
+        return existing.complaint_id
+
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Could not claim Idempotency-Key; retry")
+
+
+def complete_key(db: Session, user_id: int, key: str, complaint_id: int):
+    """Attach the new complaint to the key; runs in the complaint's transaction"""
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(complaint_id=complaint_id)
+    )
+
+
+def release_key(db: Session, user_id: int, key: str):
+    """Forget a claim whose request failed, so a retry can run"""
+    db.rollback()
+    db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.complaint_id.is_(None))
+    )
+    db.commit()
+
+
+def find_recent_duplicate(db: Session, user_id: int, title: str, description: str) -> Optional[int]:
+    """Id of the same user's complaint with the same title/description inside the window"""
+    if settings.DUPLICATE_WINDOW_SECONDS <= 0:
+        return None
+    since = datetime.utcnow() - timedelta(seconds=settings.DUPLICATE_WINDOW_SECONDS)
+    return db.execute(
+        select(Complaint.id)
+        .where(
+            Complaint.user_id == user_id,
+            Complaint.created_at >= since,
+            func.lower(func.trim(Complaint.title)) == title.strip().lower(),
+            func.lower(func.trim(Complaint.description)) == description.strip().lower()
+        )
+        .order_by(Complaint.created_at.desc())
+        .limit(1)
+    ).scalar()
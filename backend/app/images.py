@@ -0,0 +1,86 @@
+"""
+Image upload normalization
+Uploaded images are decoded with Pillow (so the real file header decides what the
+file is, not the client's content type or extension), rotated according to their
+EXIF orientation, downsized to a maximum dimension and re-encoded (WebP by default).
+Metadata such as EXIF, GPS and ICC profiles is not carried over.
+
+Decoding and encoding are CPU-bound, so they run in a process pool and never hold up
+the event loop or the request thread pool. This module is imported by the pool's
+worker processes, so it must not import the database or the app.
+"""
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.config import settings
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF"}
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def normalize_image(data: bytes, max_dimension: int, output_format: str, quality: int,
+                    max_pixels: int) -> Tuple[bytes, str]:
+    """Validate, orient, downsize and re-encode an image; returns (bytes, extension).
+
+    Raises ValueError if the data is not an allowed image or is too large to decode.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.format not in ALLOWED_FORMATS:
+                raise ValueError(f"Unsupported image format: {img.format}")
+            width, height = img.size
+            if width * height > max_pixels:
+                raise ValueError("Image dimensions are too large")
+
+            img.seek(0)  # first frame of animated images
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            if output_format == "JPEG" or not has_alpha:
+                img = img.convert("RGB")
+            else:
+                img = img.convert("RGBA")
+
+            out = io.BytesIO()
+            save_options = {"quality": quality}
+            if output_format == "WEBP":
+                save_options["method"] = 4
+            elif output_format == "JPEG":
+                save_options.update(optimize=True, progressive=True)
+            img.save(out, format=output_format, **save_options)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ValueError("Not a valid image") from e
+    return out.getvalue(), EXTENSIONS[output_format]
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if _executor is None and settings.IMAGE_WORKERS > 0:
+        # spawn, not fork: the server process has threads and open DB connections
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def process_image(data: bytes, max_dimension: int) -> Tuple[bytes, str]:
+    """normalize_image() in the process pool (or a thread if IMAGE_WORKERS is 0)"""
+    args = (data, max_dimension, settings.IMAGE_FORMAT.upper(), settings.IMAGE_QUALITY, settings.IMAGE_MAX_PIXELS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), normalize_image, *args)
+
+
+def shutdown_image_pool():
+    global _executor
+    if _executor is not None:
+        # Queued work belongs to requests that are gone by now
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
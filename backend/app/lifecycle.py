@@ -0,0 +1,80 @@
+"""
+Application lifespan: graceful shutdown
+On SIGTERM uvicorn stops accepting connections and waits for in-flight requests,
+including their BackgroundTasks (serve.py bounds that wait by --graceful-timeout).
+The lifespan shutdown below then:
+1. waits up to SHUTDOWN_DRAIN_SECONDS for background jobs still running in threads
+   (a cancelled request cannot stop a thread that is already transcoding),
+2. stops the image worker processes,
+3. closes the database pool,
+4. removes this process's temp directory and any half-written `.part` uploads.
+
+Blocking background jobs are marked with @background_job so step 1 can see them.
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import engine
+from app.images import shutdown_image_pool
+from app.storage import remove_temp_dir, storage
+
+logger = logging.getLogger(__name__)
+
+_jobs_running = 0
+_jobs_idle = threading.Condition()
+
+
+def background_job(func):
+    """Count a blocking background function as running work during shutdown"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _jobs_running
+        with _jobs_idle:
+            _jobs_running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _jobs_idle:
+                _jobs_running -= 1
+                _jobs_idle.notify_all()
+    return wrapper
+
+
+def wait_for_background_jobs(timeout: float) -> int:
+    """Block until no background job runs or `timeout` passes; returns the jobs left"""
+    deadline = time.monotonic() + timeout
+    with _jobs_idle:
+        while _jobs_running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _jobs_idle.wait(remaining)
+        return _jobs_running
+
+
+def shutdown_cleanup():
+    """Everything after the drain: runs in a thread, as it blocks"""
+    left = wait_for_background_jobs(settings.SHUTDOWN_DRAIN_SECONDS)
+    if left:
+        logger.warning("Shutting down with %d background job(s) still running", left)
+    shutdown_image_pool()
+    engine.dispose()
+    partials = storage.remove_partials()
+    if partials:
+        logger.warning("Removed %d unfinished upload(s)", partials)
+    remove_temp_dir()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    try:
+        await run_in_threadpool(shutdown_cleanup)
+    except Exception:
+        logger.exception("Graceful shutdown cleanup failed")
@@ -2,196 +2,78 @@
 Main FastAPI application
 This is the entry point for the backend server
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from app.database import engine, Base
-from app.routers import auth, complaints, admin
+from sqlalchemy.orm.exc import StaleDataError
+from app.database import engine, SessionLocal
+from app.routers import auth, complaints, admin, uploads
+from app.middleware.ratelimit import RateLimitMiddleware, ConcurrencyLimitMiddleware, build_bucket_store
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiler import SQLProfilerMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.media import MediaFiles
+from app.audio import transcoding_available
+from app.complaint_status import CONFLICT_DETAIL
+from app.lifecycle import lifespan
+from app.registry import departments, roles
+from app.metrics import install_db_hooks, render_metrics
+from app.serialization import DEFAULT_RESPONSE_CLASS
+from app.startup import run_startup_tasks
+from app.config import settings
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-print("[OK] Created database tables")
-
-# Create default roles and admin users (using User model + Role)
-from app.models import Role, User
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
-from app.security import get_password_hash
-
-
-def ensure_role_column_and_defaults():
-    """Make sure `users.role_id` column exists and populate defaults for existing rows.
-
-    This is a safe, idempotent startup helper to avoid failures when upgrading the schema
-    without running migrations in development environments.
-    """
-    # Use an explicit connection and transactional block
-    with engine.begin() as conn:
-        # If model has new user columns, add them if missing (safe upgrades for dev)
-        conn.execute(text("""
-            DO $$
-            BEGIN
-                -- Add role_id
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='users' AND column_name='role_id'
-                ) THEN
-                    ALTER TABLE users ADD COLUMN role_id INTEGER;
-                END IF;
-
-                -- Add department_id
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='users' AND column_name='department_id'
-                ) THEN
-                    ALTER TABLE users ADD COLUMN department_id INTEGER;
-                END IF;
-
-                -- Add created_at and updated_at timestamps
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='users' AND column_name='created_at'
-                ) THEN
-                    ALTER TABLE users ADD COLUMN created_at TIMESTAMP WITH TIME ZONE DEFAULT now();
-                END IF;
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='users' AND column_name='updated_at'
-                ) THEN
-                    ALTER TABLE users ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
-                END IF;
-
-                -- Add profile_picture if missing
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_name='users' AND column_name='profile_picture'
-                ) THEN
-                    ALTER TABLE users ADD COLUMN profile_picture VARCHAR(255);
-                END IF;
-
-                -- Ensure phone column is nullable (for admin users)
-                ALTER TABLE users ALTER COLUMN phone DROP NOT NULL;
-
-            END;
-            $$;
-        """))
-
-        # Ensure a 'user' role exists
-        conn.execute(text("INSERT INTO roles (name) SELECT 'user' WHERE NOT EXISTS (SELECT 1 FROM roles WHERE name='user')"))
-
-        # Set role_id for any existing users to the 'user' role (use raw UPDATE to avoid ORM-managed timestamp side-effects)
-        conn.execute(text("UPDATE users SET role_id = (SELECT id FROM roles WHERE name='user' LIMIT 1) WHERE role_id IS NULL"))
-
-        # Optionally add a foreign key constraint if not present
-        conn.execute(text("""
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.table_constraints tc
-                    JOIN information_schema.key_column_usage kcu ON tc.constraint_name = kcu.constraint_name
-                    WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_name = 'users' AND kcu.column_name = 'role_id'
-                ) THEN
-                    ALTER TABLE users ADD CONSTRAINT users_role_id_fkey FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE SET NULL;
-                END IF;
-
-                -- Add FK for department_id if missing
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.table_constraints tc
-                    JOIN information_schema.key_column_usage kcu ON tc.constraint_name = kcu.constraint_name
-                    WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_name = 'users' AND kcu.column_name = 'department_id'
-                ) THEN
-                    ALTER TABLE users ADD CONSTRAINT users_department_id_fkey FOREIGN KEY (department_id) REFERENCES departments(id) ON DELETE SET NULL;
-                END IF;
-            END;
-            $$;
-        """))
-
-
-def create_default_roles_and_admins():
-    """Ensure roles exist and create default C-Admin and CM-Admin users if missing"""
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# DDL and seeding (serve.py runs these once before starting its workers)
+if not settings.SKIP_STARTUP_TASKS:
+    run_startup_tasks()
+
+
+def load_registries():
+    """Warm the in-process department and role name/id caches"""
     db = SessionLocal()
     try:
-        # Ensure standard roles exist
-        for role_name in ("user", "c_admin", "cm_admin"):
-            r = db.query(Role).filter(Role.name == role_name).first()
-            if not r:
-                db.add(Role(name=role_name))
-        db.commit()
-
-        # Ensure any existing users without a role get the 'user' role
-        user_role = db.query(Role).filter(Role.name == "user").first()
-        if user_role:
-            try:
-                # Use a raw UPDATE to avoid touching ORM-managed timestamps if the schema differs
-                db.execute(text("UPDATE users SET role_id = :rid WHERE role_id IS NULL"), {"rid": user_role.id})
-                db.commit()
-            except Exception:
-                # Best-effort: ignore if DB schema differs; seeding step should be idempotent
-                db.rollback()
-
-        # Default admins
-        c_admin_email = "c.admin@voiceoftn.com"
-        cm_admin_email = "cm.admin@voiceoftn.com"
-
-        c_role = db.query(Role).filter(Role.name == "c_admin").first()
-        cm_role = db.query(Role).filter(Role.name == "cm_admin").first()
-
-        # Create C-Admin
-        if not db.query(User).filter(User.email == c_admin_email).first():
-            if c_role is None:
-                raise RuntimeError("c_admin role not found after creation")
-            db.add(User(
-                name="C-Admin (Complaint Handler)",
-                email=c_admin_email,
-                password=get_password_hash("cadmin123"),
-                role_id=c_role.id
-            ))
-            print("[OK] Created C-Admin user")
-        else:
-            print("[OK] C-Admin user already exists")
-
-        # Create CM-Admin
-        if not db.query(User).filter(User.email == cm_admin_email).first():
-            if cm_role is None:
-                raise RuntimeError("cm_admin role not found after creation")
-            db.add(User(
-                name="CM-Admin (Chief Manager)",
-                email=cm_admin_email,
-                password=get_password_hash("cmadmin123"),
-                role_id=cm_role.id
-            ))
-            print("[OK] Created CM-Admin user")
-        else:
-            print("[OK] CM-Admin user already exists")
-
-        db.commit()
-
+        departments.load(db)
+        roles.load(db)
+        print(f"[OK] Loaded {len(departments)} departments and {len(roles)} roles")
     except Exception as e:
-        print(f"Warning: Could not create default roles/admins: {e}")
+        print(f"Warning: Could not load registries: {e}")
     finally:
         db.close()
 
-# Ensure upload directories exist
-os.makedirs("uploads/profile_pictures", exist_ok=True)
-os.makedirs("uploads/complaints", exist_ok=True)
-os.makedirs("uploads/voice_recordings", exist_ok=True)
 
-# Ensure role column and defaults before seeding admins
-try:
-    ensure_role_column_and_defaults()
-except Exception as e:
-    print(f"Warning: Could not ensure role column/defaults: {e}")
+load_registries()
 
-create_default_roles_and_admins()
+if settings.VOICE_TRANSCODE_ENABLED and not transcoding_available():
+    print("Warning: ffmpeg/ffprobe not found; voice recordings will be stored as uploaded")
 
 # Create FastAPI app
 app = FastAPI(
     title="Voice of TN API",
     description="Backend API for Voice of Tamil Nadu Complaint Management System",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=DEFAULT_RESPONSE_CLASS,
+    lifespan=lifespan  # graceful shutdown, see app/lifecycle.py
+)
+
+# Compression (innermost, so metrics see the bytes actually sent)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        cache_bytes=settings.COMPRESSION_CACHE_MB * 1024 * 1024
+    )
+
+# Rate limiting and load shedding (added before CORS so CORS wraps their 429/503 responses)
+app.add_middleware(
+    RateLimitMiddleware,
+    store=build_bucket_store(settings.RATE_LIMIT_REDIS_URL),
+    enabled=settings.RATE_LIMIT_ENABLED
 )
+app.add_middleware(ConcurrencyLimitMiddleware, max_in_flight=settings.MAX_CONCURRENT_REQUESTS)
+
+# Request metrics (outside the limiters so rejected requests are counted too)
+install_db_hooks(engine)
+app.add_middleware(SQLProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -208,13 +90,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Mount media files (Range requests, immutable caching; see app/media.py).
+# With S3 storage, media is served by the bucket / CDN at MEDIA_BASE_URL instead.
+if settings.STORAGE_BACKEND == "local":
+    app.mount("/uploads", MediaFiles(directory=settings.LOCAL_STORAGE_ROOT), name="uploads")
+
+@app.exception_handler(StaleDataError)
+def version_conflict(request: Request, exc: StaleDataError):
+    """A complaint UPDATE/DELETE lost the version compare-and-swap (see models.Complaint)"""
+    return DEFAULT_RESPONSE_CLASS(status_code=status.HTTP_409_CONFLICT, content={"detail": CONFLICT_DETAIL})
+
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(complaints.router)
 app.include_router(admin.router)
+app.include_router(uploads.router)
+
 
 @app.get("/")
 def root():
@@ -232,4 +124,10 @@ def root():
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
\ No newline at end of file
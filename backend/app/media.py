@@ -0,0 +1,158 @@
+"""
+Media (uploads) serving
+- MediaFiles: StaticFiles for /uploads with long-lived immutable caching (upload
+  filenames embed a timestamp and are never reused), single-range HTTP Range
+  requests so audio can seek, and zero-copy sends when the ASGI server offers the
+  `http.response.zerocopysend` extension.
+- media_url(): maps a stored `/uploads/...` path to the URL clients should use. With
+  MEDIA_BASE_URL set, clients fetch media from an external server (e.g. nginx) and
+  the API workers never touch the bytes; with MEDIA_SIGNING_SECRET set, URLs carry
+  an expiry and a signature in nginx `secure_link` format:
+
+      location /uploads/ {
+          alias /path/to/backend/uploads/;
+          secure_link $arg_md5,$arg_expires;
+          secure_link_md5 "$secure_link_expires$uri <MEDIA_SIGNING_SECRET>";
+          if ($secure_link = "") { return 403; }
+          if ($secure_link = "0") { return 410; }
+          sendfile on;
+          add_header Cache-Control "private, max-age=3600";
+      }
+"""
+import base64
+import hashlib
+import os
+import re
+import time
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+
+UPLOADS_PREFIX = "/uploads/"
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=start-end` range into an inclusive (start, end).
+
+    Returns None for headers we do not handle (multiple ranges, other units), in
+    which case the whole file is sent. Raises ValueError for unsatisfiable ranges.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+    if not start_text:
+        # Suffix range: the last N bytes
+        length = int(end_text)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+class MediaFileResponse(FileResponse):
+    """FileResponse with Range support and zero-copy sending when available"""
+
+    def __init__(self, path, stat_result: os.stat_result, method: str, request_headers: Headers, cache_control: str):
+        super().__init__(path, stat_result=stat_result, method=method)
+        self.headers["Accept-Ranges"] = "bytes"
+        self.headers["Cache-Control"] = cache_control
+        self.file_size = stat_result.st_size
+        self.start, self.end = 0, self.file_size - 1
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == self.headers.get("etag")):
+            try:
+                byte_range = parse_range(range_header, self.file_size)
+            except ValueError:
+                self.status_code = 416
+                self.headers["Content-Range"] = f"bytes */{self.file_size}"
+                self.headers["Content-Length"] = "0"
+                self.send_header_only = True
+                return
+            if byte_range is not None:
+                self.start, self.end = byte_range
+                self.status_code = 206
+                self.headers["Content-Range"] = f"bytes {self.start}-{self.end}/{self.file_size}"
+                self.headers["Content-Length"] = str(self.end - self.start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        count = self.end - self.start + 1
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; end the response cleanly
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class MediaFiles(StaticFiles):
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        cache_control = f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+        response = MediaFileResponse(full_path, stat_result, scope["method"], request_headers, cache_control)
+        if response.status_code == 200 and self.is_not_modified(response.headers, request_headers):
+            return Response(status_code=304, headers={
+                "etag": response.headers["etag"],
+                "cache-control": cache_control
+            })
+        return response
+
+
+def sign_media_path(uri: str, expires: int, secret: str) -> str:
+    """nginx secure_link_md5 signature of "<expires><uri> <secret>" (base64url, no padding)"""
+    digest = hashlib.md5(f"{expires}{uri} {secret}".encode("utf-8")).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def media_url(path: Optional[str]) -> Optional[str]:
+    """Client-facing URL for a stored media path such as /uploads/complaints/x.png"""
+    if not path or not settings.MEDIA_BASE_URL or not path.startswith(UPLOADS_PREFIX):
+        return path
+
+    base = settings.MEDIA_BASE_URL.rstrip("/")
+    if not settings.MEDIA_SIGNING_SECRET:
+        return f"{base}{path}"
+
+    # Round the expiry up to a whole TTL window so URLs stay stable (and cacheable)
+    # for a while instead of changing on every response
+    ttl = settings.MEDIA_URL_TTL_SECONDS
+    expires = (int(time.time()) // ttl + 2) * ttl
+    signature = sign_media_path(path, expires, settings.MEDIA_SIGNING_SECRET)
+    return f"{base}{path}?md5={signature}&expires={expires}"
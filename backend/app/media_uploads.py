@@ -0,0 +1,150 @@
+"""
+Upload handling shared by the complaint, profile and direct-upload endpoints
+Validates an upload, normalizes it (images) or probes it (voice), and writes it to
+the configured storage backend under a fresh, never-reused key. Returns the public
+path that is stored in the database.
+
+Direct uploads: clients may upload to storage themselves using a presigned POST
+(POST /api/uploads/presign). Those objects land under `incoming/<user id>/` and are
+attached to a complaint by key; they are then validated and copied (voice) or
+re-encoded (images) like any other upload. The incoming object itself is only
+deleted once the complaint is committed (delete_incoming), so a failed submission
+can be retried with the same key. Unattached incoming objects are removed by
+gc_uploads.py.
+"""
+import mimetypes
+import re
+import secrets
+import subprocess
+import uuid
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.audio import AudioInfo, probe_audio
+from app.config import settings
+from app.images import process_image
+from app.storage import UploadTooLarge, spool_to_tempfile, storage, url_for_key
+
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+INCOMING_PREFIX = "incoming"
+_EXTENSION_RE = re.compile(r"^\.[A-Za-z0-9]{1,8}$")
+
+
+def new_key(folder: str, stem: str, user_id: int, extension: str) -> str:
+    timestamp = int(datetime.utcnow().timestamp())
+    return f"{folder}/{stem}_{user_id}_{timestamp}_{secrets.token_hex(4)}{extension}"
+
+
+def _extension(filename: Optional[str], content_type: Optional[str], default: str) -> str:
+    extension = PurePosixPath(filename or "").suffix
+    if _EXTENSION_RE.match(extension):
+        return extension.lower()
+    return mimetypes.guess_extension(content_type or "") or default
+
+
+def voice_max_bytes() -> int:
+    return settings.VOICE_MAX_UPLOAD_MB * 1024 * 1024
+
+
+async def store_image(content: bytes, folder: str, stem: str, user_id: int, max_dimension: int) -> str:
+    """Normalize an image (see app/images.py) and store it; returns its public path"""
+    if len(content) > IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Image size must be less than 5MB")
+    try:
+        processed, extension = await process_image(content, max_dimension)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is not a valid image")
+
+    key = new_key(folder, stem, user_id, extension)
+    await run_in_threadpool(storage.save_bytes, key, processed, mimetypes.guess_type(key)[0])
+    return url_for_key(key)
+
+
+def check_voice_file(path: Path) -> Optional[AudioInfo]:
+    """Make sure a local file is audio of acceptable length (skipped without ffprobe)"""
+    try:
+        info = probe_audio(path)
+    except (ValueError, subprocess.TimeoutExpired):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a readable audio recording"
+        )
+    if info and info.duration and info.duration > settings.VOICE_MAX_DURATION_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Voice recording must be shorter than {settings.VOICE_MAX_DURATION_SECONDS} seconds"
+        )
+    return info
+
+
+async def store_voice_upload(upload: UploadFile, user_id: int) -> Tuple[str, Optional[AudioInfo]]:
+    """Stream a voice recording to a temp file, check it, and store it"""
+    if not upload.content_type or not upload.content_type.startswith('audio/'):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file must be an audio file")
+
+    extension = _extension(upload.filename, upload.content_type, ".wav")
+    try:
+        temp_path = await run_in_threadpool(spool_to_tempfile, upload.file, voice_max_bytes(), extension)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Voice recording must be less than {settings.VOICE_MAX_UPLOAD_MB}MB"
+        )
+    try:
+        info = await run_in_threadpool(check_voice_file, temp_path)
+        key = new_key("voice_recordings", "voice", user_id, extension)
+        await run_in_threadpool(storage.save_file, key, temp_path, upload.content_type)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return url_for_key(key), info
+
+
+# ===== Direct (presigned) uploads =====
+
+def incoming_key(user_id: int, content_type: str) -> str:
+    extension = mimetypes.guess_extension(content_type) or ""
+    return f"{INCOMING_PREFIX}/{user_id}/{uuid.uuid4().hex}{extension}"
+
+
+def _check_incoming_key(key: str, user_id: int):
+    path = PurePosixPath(key)
+    if path.parts[:2] != (INCOMING_PREFIX, str(user_id)) or len(path.parts) != 3:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid upload key")
+    if not storage.exists(key):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file not found; upload it first")
+
+
+async def attach_incoming_image(key: str, user_id: int, folder: str, stem: str, max_dimension: int) -> str:
+    await run_in_threadpool(_check_incoming_key, key, user_id)
+    try:
+        content = await run_in_threadpool(storage.read_bytes, key, IMAGE_MAX_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Image size must be less than 5MB")
+    return await store_image(content, folder, stem, user_id, max_dimension)
+
+
+def _attach_incoming_voice(key: str, user_id: int) -> Tuple[str, Optional[AudioInfo]]:
+    _check_incoming_key(key, user_id)
+    with storage.local_copy(key) as path:
+        if path.stat().st_size > voice_max_bytes():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Voice recording must be less than {settings.VOICE_MAX_UPLOAD_MB}MB"
+            )
+        info = check_voice_file(path)
+    target = new_key("voice_recordings", "voice", user_id, PurePosixPath(key).suffix or ".audio")
+    storage.copy(key, target)
+    return url_for_key(target), info
+
+
+async def attach_incoming_voice(key: str, user_id: int) -> Tuple[str, Optional[AudioInfo]]:
+    return await run_in_threadpool(_attach_incoming_voice, key, user_id)
+
+
+def delete_incoming(keys: List[str]):
+    """Remove attached direct uploads; call once the complaint using them is committed"""
+    storage.delete_many(keys)
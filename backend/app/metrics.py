@@ -0,0 +1,127 @@
+"""
+Prometheus metrics and per-request database accounting
+The metrics middleware opens a RequestStats for each request; SQLAlchemy cursor
+events add every query's count and duration to whichever request is current, and
+count whether SQLAlchemy found the statement's compiled SQL in its cache. Hit ratio:
+    sum(rate(db_compiled_cache_total{result="hit"}[5m])) / sum(rate(db_compiled_cache_total[5m]))
+"""
+import os
+import sys
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from prometheus_client import (  # type: ignore
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, default
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 5242880)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "Request body size", ["method", "route"], buckets=SIZE_BUCKETS
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size", ["method", "route"], buckets=SIZE_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", multiprocess_mode="livesum"
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements per request", ["method", "route"], buckets=QUERY_COUNT_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per request", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+DB_COMPILED_CACHE = Counter(
+    "db_compiled_cache_total", "SQL statements by compiled-statement cache outcome", ["result"]
+)
+# ExecutionContext.cache_hit -> label; "uncacheable" covers text() and DDL
+_CACHE_RESULTS = {
+    default.CACHE_HIT: "hit",
+    default.CACHE_MISS: "miss",
+    default.NO_CACHE_KEY: "uncacheable",
+    default.NO_DIALECT_SUPPORT: "unsupported",
+}
+
+
+class RequestStats:
+    """Mutable per-request counters (shared with threadpool workers via the context).
+
+    `statements` is None unless the SQL profiler is capturing this request; then
+    it collects (statement, seconds, call site) for every query.
+    """
+    __slots__ = ("query_count", "db_time", "statements")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements: Optional[List[Tuple[str, float, str]]] = None
+
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.join(_APP_DIR, "metrics.py"), os.path.join(_APP_DIR, "database.py")}
+
+
+def _call_site() -> str:
+    """First frame inside the app package that issued the query, e.g. routers/admin.py:40 in get_stats"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_DIR) and filename not in _SKIP_FILES:
+            return f"{os.path.relpath(filename, _APP_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERIES.inc()
+    if context is not None:
+        result = _CACHE_RESULTS.get(getattr(context, "cache_hit", None))
+        if result is not None:
+            DB_COMPILED_CACHE.labels(result).inc()
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
+        if stats.statements is not None:
+            stats.statements.append((statement, elapsed, _call_site()))
+
+
+def install_db_hooks(engine: Engine):
+    """Count queries and DB time for every statement run on `engine`"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render_metrics() -> tuple:
+    """Return (body, content type) for the /metrics endpoint.
+
+    With PROMETHEUS_MULTIPROC_DIR set (multi-worker deployments) the values of
+    all worker processes are aggregated.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess  # type: ignore
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,186 @@
+"""
+Response compression middleware (brotli when available, otherwise gzip)
+- Only compressible content types above a size threshold are compressed.
+- Streaming responses are compressed chunk by chunk.
+- Compressed bodies are kept in a small LRU keyed by a hash of the uncompressed
+  body, so repeated identical responses (e.g. the public feed between changes)
+  are not recompressed on every hit.
+- Large bodies are compressed in a worker thread to keep the event loop free.
+Media under /uploads is skipped: images and audio are already compressed and are
+served as files (see main.py).
+"""
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore  # optional dependency
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "text/", "application/javascript", "application/xml", "image/svg+xml"
+)
+SKIP_PREFIXES = ("/uploads/",)
+THREAD_THRESHOLD = 64 * 1024
+
+
+def _accepted_encodings(scope: Scope) -> set:
+    accepted = set()
+    for part in Headers(scope=scope).get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            accepted.add(name.lower())
+    return accepted
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies bounded by total size in bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+
+    @staticmethod
+    def key(encoding: str, body: bytes) -> Tuple[str, bytes]:
+        return encoding, hashlib.blake2b(body, digest_size=16).digest()
+
+    def get(self, key) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value: bytes):
+        if len(value) > self.max_bytes // 4 or key in self._entries:
+            return
+        self._entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 5, cache_bytes: int = 32 * 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedBodyCache(cache_bytes) if cache_bytes > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        accepted = _accepted_encodings(scope)
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def stream_compressor(self, encoding: str):
+        if encoding == "br":
+            return brotli.Compressor(quality=self.brotli_quality)
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+    async def compress_cached(self, encoding: str, body: bytes) -> bytes:
+        key = None
+        if self.cache is not None:
+            key = CompressedBodyCache.key(encoding, body)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if len(body) >= THREAD_THRESHOLD:
+            compressed = await anyio.to_thread.run_sync(self.compress, encoding, body)
+        else:
+            compressed = self.compress(encoding, body)
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.mode = None  # None until the first body chunk; then 'passthrough' or 'stream'
+        self.compressor = None
+
+    def _compressible(self) -> bool:
+        headers = Headers(raw=self.start_message["headers"])
+        if "content-encoding" in headers or self.start_message["status"] in (204, 206, 304):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _mark_encoded(self, content_length: Optional[int]):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.mode is None:
+            if not self._compressible() or (not more_body and len(body) < self.middleware.minimum_size):
+                self.mode = "passthrough"
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            if not more_body:
+                # Whole body in one message: compress (or reuse) in one go
+                compressed = await self.middleware.compress_cached(self.encoding, body)
+                self._mark_encoded(len(compressed))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            self.mode = "stream"
+            self.compressor = self.middleware.stream_compressor(self.encoding)
+            self._mark_encoded(None)
+            await self._send(self.start_message)
+
+        if self.mode == "passthrough":
+            await self._send(message)
+            return
+
+        chunk = self.compressor.process(body) if self.encoding == "br" else self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish() if self.encoding == "br" else self.compressor.flush()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
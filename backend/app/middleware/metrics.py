@@ -0,0 +1,80 @@
+"""
+Request instrumentation middleware
+Records latency, request/response sizes, in-flight requests and per-request SQL
+counts, and adds a `Server-Timing` header so browser dev tools show DB vs app time.
+"""
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import (
+    DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST, HTTP_IN_FLIGHT, HTTP_LATENCY,
+    HTTP_REQUESTS, HTTP_REQUEST_SIZE, HTTP_RESPONSE_SIZE, RequestStats, current_request_stats
+)
+
+SKIP_PATHS = ("/metrics",)
+
+
+def _route_label(scope: Scope) -> str:
+    """Use the route template (e.g. /api/complaints/{complaint_id}) to keep label cardinality bounded"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope.get("path", "")
+    if path.startswith("/uploads/"):
+        return "/uploads"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+        request_size = 0
+        response_size = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                app_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries", app;dur={app_ms:.1f}'
+                )
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            current_request_stats.reset(token)
+            method = scope["method"]
+            route = _route_label(scope)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUEST_SIZE.labels(method, route).observe(request_size)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(response_size)
+            DB_QUERIES_PER_REQUEST.labels(method, route).observe(stats.query_count)
+            DB_TIME_PER_REQUEST.labels(method, route).observe(stats.db_time)
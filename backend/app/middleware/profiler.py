@@ -0,0 +1,58 @@
+"""
+SQL profiler middleware
+Turns on statement capture for the current request (see app.profiler) and logs
+the request afterwards if it was profiled or crossed the slow-request thresholds.
+Must run inside MetricsMiddleware, which opens the per-request RequestStats.
+"""
+from jose import JWTError  # type: ignore
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import profiler
+from app.config import settings
+from app.metrics import current_request_stats
+from app.security import decode_access_token
+
+PROFILE_HEADER = b"x-sql-profile"
+ADMIN_ROLES = ("c_admin", "cm_admin")
+
+
+def _admin_requested_profile(scope: Scope) -> bool:
+    """True when an admin's request carries `X-SQL-Profile: 1` (role read from the JWT)"""
+    requested = False
+    token = None
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            requested = value.strip() in (b"1", b"true")
+        elif name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                token = None
+    if not requested or not token:
+        return False
+    try:
+        return decode_access_token(token).get("role") in ADMIN_ROLES
+    except JWTError:
+        return False
+
+
+class SQLProfilerMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        stats = current_request_stats.get()
+        if scope["type"] != "http" or stats is None:
+            await self.app(scope, receive, send)
+            return
+
+        profiling = settings.SQL_PROFILER_ENABLED or _admin_requested_profile(scope)
+        if profiling:
+            stats.statements = []
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if profiling:
+                profiler.record_request(stats)
+            if profiling or profiler.is_slow(stats):
+                profiler.log_request(scope["method"], scope["path"], stats)
@@ -0,0 +1,225 @@
+"""
+Rate limiting and load shedding middleware
+- RateLimitMiddleware: token buckets per route policy, keyed by user id (from the
+  JWT) or client IP. Buckets live in process memory, or in Redis when
+  RATE_LIMIT_REDIS_URL is set so all workers share them.
+- ConcurrencyLimitMiddleware: rejects requests with 503 once a worker already has
+  MAX_CONCURRENT_REQUESTS in flight, before it saturates.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from jose import JWTError  # type: ignore
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitPolicy(NamedTuple):
+    """`rate` requests per `per_seconds`, allowing bursts of up to `burst`"""
+    name: str
+    rate: float
+    per_seconds: float
+    burst: int
+    key_by: str  # 'ip' or 'user' (falls back to ip for anonymous requests)
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.rate / self.per_seconds
+
+
+# (method, path prefix) -> policy; first match wins
+ROUTE_POLICIES: List[Tuple[str, str, RateLimitPolicy]] = [
+    # Every login attempt costs a bcrypt verification
+    ("POST", "/api/auth/login", RateLimitPolicy("login", 10, 60, 5, "ip")),
+    ("POST", "/api/auth/register", RateLimitPolicy("register", 20, 3600, 5, "ip")),
+    ("POST", "/api/auth/upload-profile-picture", RateLimitPolicy("upload", 10, 60, 3, "user")),
+    ("POST", "/api/complaints", RateLimitPolicy("complaint_create", 10, 60, 3, "user")),
+]
+DEFAULT_POLICY = RateLimitPolicy("default", 300, 60, 60, "user")
+
+EXEMPT_PATHS = ("/health", "/metrics")
+# Static media (the /uploads mount): a feed page loads many images and audio players
+# send Range requests, so counting these would 429 ordinary browsing
+EXEMPT_PREFIXES = ("/uploads/",)
+
+
+def is_exempt(path: str) -> bool:
+    return path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES)
+
+
+def policy_for(method: str, path: str) -> RateLimitPolicy:
+    for policy_method, prefix, policy in ROUTE_POLICIES:
+        if method == policy_method and path.startswith(prefix):
+            return policy
+    return DEFAULT_POLICY
+
+
+class MemoryBucketStore:
+    """Token buckets in an LRU dict, guarded by a lock (state is per worker process).
+
+    Past `max_keys` the least recently used bucket is dropped, O(1) per request even
+    when a flood of new client IPs keeps every bucket fresh. A dropped bucket starts
+    full again, which only matters for keys idle longer than the rest of the table.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    async def take(self, key: str, policy: RateLimitPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        """Try to take `cost` tokens. Returns (allowed, seconds until allowed)."""
+        now = time.monotonic()
+        refill = policy.tokens_per_second
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(policy.burst), now))
+            tokens = min(float(policy.burst), tokens + (now - last) * refill)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                allowed, wait = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, wait = False, (cost - tokens) / refill
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+
+class RedisBucketStore:
+    """Token buckets shared by all workers through Redis (atomic via a Lua script)"""
+
+    SCRIPT = """
+    local tokens_per_second = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * tokens_per_second)
+    local allowed = 0
+    local wait = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    else
+        wait = (cost - tokens) / tokens_per_second
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / tokens_per_second) + 1)
+    return {allowed, tostring(wait)}
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis  # type: ignore  # optional dependency
+        self._redis = aioredis.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, policy: RateLimitPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        try:
+            allowed, wait = await self._script(
+                keys=[f"ratelimit:{key}"],
+                args=[policy.tokens_per_second, policy.burst, time.time(), cost]
+            )
+        except Exception as e:
+            # Fail open: a Redis outage should not take the API down with it
+            logger.warning("Rate limit store unavailable, allowing request: %s", e)
+            return True, 0.0
+        return bool(int(allowed)), float(wait)
+
+
+def _client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user_id_from_headers(scope: Scope) -> Optional[str]:
+    """Read the user id claim from a Bearer token without touching the database"""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                user_id = decode_access_token(token).get("user_id")
+            except JWTError:
+                return None
+            return str(user_id) if user_id is not None else None
+    return None
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, store=None, enabled: bool = True):
+        self.app = app
+        self.store = store or MemoryBucketStore()
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http" or is_exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        policy = policy_for(scope["method"], scope["path"])
+        identity = None
+        if policy.key_by == "user":
+            user_id = _user_id_from_headers(scope)
+            identity = f"user:{user_id}" if user_id else None
+        if identity is None:
+            identity = f"ip:{_client_ip(scope)}"
+
+        allowed, wait = await self.store.take(f"{policy.name}:{identity}", policy)
+        if not allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Too many requests, please retry later"},
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+
+class ConcurrencyLimitMiddleware:
+    """Shed load with 503 once `max_in_flight` requests are already being handled"""
+
+    def __init__(self, app: ASGIApp, max_in_flight: int):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0  # only touched from the event loop thread
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self.max_in_flight <= 0 or is_exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= self.max_in_flight:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry shortly"},
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+def build_bucket_store(redis_url: Optional[str]):
+    """In-memory store by default; Redis-backed when a URL is configured"""
+    if redis_url:
+        return RedisBucketStore(redis_url)
+    return MemoryBucketStore()
@@ -3,8 +3,8 @@ Database models (tables) for VoiceOfTN Complaint Management System
 These SQLAlchemy models define the schema and relationships for Users, Roles,
 Departments, Complaints, Complaint messages/updates and status history.
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Enum as SAEnum
-from sqlalchemy.orm import relationship, Mapped
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Index, Enum as SAEnum
+from sqlalchemy.orm import relationship, object_session, Mapped
 from datetime import datetime
 from app.database import Base
 from typing import Optional
@@ -66,6 +66,12 @@ class User(Base):
     messages = relationship("ComplaintMessage", back_populates="sender", cascade="all, delete-orphan")
     status_changes = relationship("ComplaintStatusHistory", back_populates="changed_by_user", cascade="all, delete-orphan")
 
+    @property
+    def role_name(self) -> Optional[str]:
+        """Role name from the role registry, without loading `role`"""
+        from app.registry import roles
+        return roles.name_for(object_session(self), self.role_id)
+
 class Complaint(Base):
     """Complaints table - core entity"""
     __tablename__ = "complaints"
@@ -86,21 +92,48 @@ class Complaint(Base):
     # Optional: fields for media paths (images, voice recordings)
     image_path = Column(String(500), nullable=True)
     voice_path = Column(String(500), nullable=True)
+    # Voice metadata from ffprobe; the as-uploaded file is kept only if the user asked
+    voice_duration_seconds = Column(Float, nullable=True)
+    voice_sample_rate = Column(Integer, nullable=True)
+    voice_original_path = Column(String(500), nullable=True)
 
     # Track which admin updated the complaint (email)
     updated_by_admin = Column(String(100), nullable=True)
 
+    # Latest admin response only; every response is a ComplaintMessage row
     admin_response = Column(Text, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Optimistic concurrency: every ORM UPDATE/DELETE runs "WHERE id = ? AND version = ?"
+    # and bumps it; a concurrent change makes the flush raise StaleDataError (409)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+
+    # Per-user feed (GET /api/complaints/me), newest first
+    __table_args__ = (
+        Index("ix_complaints_user_created", "user_id", "created_at", "id"),
+    )
+
     # Relationships
     user = relationship("User", back_populates="complaints")
     department = relationship("Department", back_populates="complaints")
     messages = relationship("ComplaintMessage", back_populates="complaint", cascade="all, delete-orphan")
     status_history = relationship("ComplaintStatusHistory", back_populates="complaint", cascade="all, delete-orphan")
 
+class UserComplaintStats(Base):
+    """Per-user complaint counters, kept in step with `complaints` on every write
+    (see app/user_stats.py) so the profile summary is a primary-key read"""
+    __tablename__ = "user_complaint_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    pending = Column(Integer, nullable=False, default=0, server_default="0")
+    in_progress = Column(Integer, nullable=False, default=0, server_default="0")
+    solved = Column(Integer, nullable=False, default=0, server_default="0")
+    last_updated_at = Column(DateTime, nullable=True)
+
 class ComplaintMessage(Base):
     """Messages / Comments on complaints (from users or admins)"""
     __tablename__ = "complaint_messages"
@@ -109,11 +142,23 @@ class ComplaintMessage(Base):
     complaint_id = Column(Integer, ForeignKey("complaints.id"), nullable=False, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     message = Column(Text, nullable=False)
+    # 'message' (comment) or 'admin_response' (see app/admin_responses.py)
+    kind = Column(String(20), nullable=False, default="message", server_default="message")
     created_at = Column(DateTime, default=datetime.utcnow)
 
     complaint = relationship("Complaint", back_populates="messages")
     sender = relationship("User", back_populates="messages")
 
+    # Timeline reads filter by complaint and order by time; include the small
+    # columns so Postgres can answer most of the scan from the index alone
+    __table_args__ = (
+        Index(
+            "ix_complaint_messages_complaint_created",
+            "complaint_id", "created_at",
+            postgresql_include=["sender_id"]
+        ),
+    )
+
 class ComplaintStatusHistory(Base):
     """Tracks every status change for a complaint (audit trail)"""
     __tablename__ = "complaint_status_history"
@@ -127,4 +172,26 @@ class ComplaintStatusHistory(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     complaint = relationship("Complaint", back_populates="status_history")
-    changed_by_user = relationship("User", back_populates="status_changes")
\ No newline at end of file
+    changed_by_user = relationship("User", back_populates="status_changes")
+
+    __table_args__ = (
+        Index(
+            "ix_complaint_status_history_complaint_ts",
+            "complaint_id", "timestamp",
+            postgresql_include=["old_status", "new_status", "changed_by"]
+        ),
+    )
+
+class IdempotencyKey(Base):
+    """Idempotency-Key of a complaint submission (see app/idempotency.py).
+
+    `complaint_id` stays NULL while the first request is still being processed.
+    Rows older than IDEMPOTENCY_TTL_HOURS are purged.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(32), nullable=False)
+    complaint_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+SQL profiler
+Aggregates the statements captured for profiled requests over the worker's
+lifetime and logs requests that cross the query-count or DB-time thresholds.
+Capture is opt-in: SQL_PROFILER_ENABLED profiles every request, and admins can
+profile a single request by sending the `X-SQL-Profile: 1` header.
+"""
+import logging
+import threading
+from typing import Dict, List
+
+from app.config import settings
+from app.metrics import RequestStats
+
+logger = logging.getLogger("app.profiler")
+
+_lock = threading.Lock()
+# statement -> [calls, total seconds, max seconds, first seen call site]
+_statement_totals: Dict[str, list] = {}
+
+
+def _trim_statements():
+    """Keep the SQL_PROFILER_MAX_STATEMENTS statements with the most total time.
+
+    Runs once the table is twice that size, so the sort is amortised over many
+    new statements; call with _lock held.
+    """
+    limit = settings.SQL_PROFILER_MAX_STATEMENTS
+    if len(_statement_totals) <= 2 * limit:
+        return
+    keep = sorted(_statement_totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    _statement_totals.clear()
+    _statement_totals.update(keep)
+
+
+def record_request(stats: RequestStats):
+    """Fold a profiled request's statements into the worker-wide totals"""
+    if not stats.statements:
+        return
+    with _lock:
+        for statement, elapsed, call_site in stats.statements:
+            entry = _statement_totals.get(statement)
+            if entry is None:
+                _statement_totals[statement] = [1, elapsed, elapsed, call_site]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                if elapsed > entry[2]:
+                    entry[2] = elapsed
+        _trim_statements()
+
+
+def top_statements(limit: int = 20) -> List[dict]:
+    """Statements ordered by total time spent in them since the worker started"""
+    with _lock:
+        items = sorted(_statement_totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return [
+        {
+            "statement": statement,
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total * 1000 / calls, 3),
+            "max_ms": round(worst * 1000, 3),
+            "call_site": call_site
+        }
+        for statement, (calls, total, worst, call_site) in items
+    ]
+
+
+def reset_statements():
+    with _lock:
+        _statement_totals.clear()
+
+
+def is_slow(stats: RequestStats) -> bool:
+    return (
+        stats.query_count >= settings.SLOW_REQUEST_QUERY_COUNT
+        or stats.db_time * 1000 >= settings.SLOW_REQUEST_DB_MS
+    )
+
+
+def log_request(method: str, path: str, stats: RequestStats):
+    """Log a slow or explicitly profiled request, grouping repeated statements (N+1 patterns)"""
+    summary = f"{method} {path}: {stats.query_count} queries, {stats.db_time * 1000:.1f} ms in DB"
+    if not stats.statements:
+        logger.warning("Slow request %s", summary)
+        return
+
+    grouped: Dict[tuple, list] = {}
+    for statement, elapsed, call_site in stats.statements:
+        entry = grouped.setdefault((statement, call_site), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    lines = [
+        f"  {count}x {total * 1000:8.2f} ms  {call_site}  {' '.join(statement.split())[:200]}"
+        for (statement, call_site), (count, total) in sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)
+    ]
+    level = logging.WARNING if is_slow(stats) else logging.INFO
+    logger.log(level, "SQL profile %s\n%s", summary, "\n".join(lines))
@@ -0,0 +1,28 @@
+"""
+Hot statements, built once
+Every authenticated request looks up its user by email, and most complaint routes
+load one complaint by id. Building a select() per call costs little, but SQLAlchemy
+then has to compute the statement's cache key again to find its compiled form. These
+module-level statements take their values as bound parameters, so the key is computed
+once per process and each call goes straight to the compiled-statement cache
+(`db_compiled_cache_total` in /metrics). Department and role names are resolved in
+memory instead (app/registry.py); the complaint list statements are in
+app/complaint_rows.py.
+"""
+from typing import Optional
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from app.models import Complaint, User
+
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+COMPLAINT_BY_ID = select(Complaint).where(Complaint.id == bindparam("complaint_id"))
+
+
+def user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.execute(USER_BY_EMAIL, {"email": email}).scalar()
+
+
+def complaint_by_id(db: Session, complaint_id: int) -> Optional[Complaint]:
+    return db.execute(COMPLAINT_BY_ID, {"complaint_id": complaint_id}).scalar()
@@ -0,0 +1,127 @@
+"""
+In-process name <-> id registries for small lookup tables
+Departments are looked up by name on every complaint submission and roles on every
+authenticated request. The registry keeps the whole table in memory (loaded at
+startup), so the hot path needs no query, and creates missing names atomically with
+INSERT ... ON CONFLICT DO NOTHING inside the caller's transaction.
+
+Each worker process has its own copy. It is invalidated when this process changes
+the table through the ORM and reloaded after REGISTRY_TTL_SECONDS, so names added
+by other workers show up without a restart (a miss always falls through to the
+database anyway).
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Department, Role
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# session.info entry for ids inserted in the open transaction
+_PENDING_KEY = "registry_pending"
+
+
+class NameRegistry:
+    def __init__(self, model):
+        self.model = model
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        for event_name in ("after_insert", "after_update", "after_delete"):
+            event.listen(model, event_name, self._on_change)
+
+    def _on_change(self, mapper, connection, target):
+        self.invalidate()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def load(self, db: Session):
+        rows = db.execute(select(self.model.id, self.model.name)).all()
+        with self._lock:
+            self._ids = {name: id_ for id_, name in rows}
+            self._names = {id_: name for id_, name in rows}
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > settings.REGISTRY_TTL_SECONDS:
+            self.load(db)
+
+    def _remember(self, name: str, id_: int):
+        with self._lock:
+            self._ids[name] = id_
+            self._names[id_] = name
+
+    def id_for(self, db: Session, name: str) -> Optional[int]:
+        self._ensure_loaded(db)
+        id_ = self._ids.get(name)
+        if id_ is None:
+            id_ = db.execute(select(self.model.id).where(self.model.name == name)).scalar()
+            if id_ is not None:
+                self._remember(name, id_)
+        return id_
+
+    def name_for(self, db: Session, id_: int) -> Optional[str]:
+        self._ensure_loaded(db)
+        name = self._names.get(id_)
+        if name is None:
+            name = db.execute(select(self.model.name).where(self.model.id == id_)).scalar()
+            if name is not None:
+                self._remember(name, id_)
+        return name
+
+    def get_or_create(self, db: Session, name: str) -> int:
+        """Id for `name`, inserting the row if needed. Does not commit.
+
+        A newly inserted id is only cached once the caller's transaction commits.
+        """
+        id_ = self.id_for(db, name)
+        if id_ is not None:
+            return id_
+
+        insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+        if insert is not None:
+            id_ = db.execute(
+                insert(self.model).values(name=name)
+                .on_conflict_do_nothing(index_elements=[self.model.name])
+                .returning(self.model.id)
+            ).scalar()
+        else:
+            try:
+                with db.begin_nested():
+                    id_ = db.execute(
+                        self.model.__table__.insert().values(name=name).returning(self.model.id)
+                    ).scalar()
+            except IntegrityError:
+                id_ = None
+        if id_ is None:
+            # Another transaction inserted it first; it is committed, so cache it
+            return self.id_for(db, name)
+
+        db.info.setdefault(_PENDING_KEY, []).append((self, name, id_))
+        return id_
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed(session: Session):
+    for registry, name, id_ in session.info.pop(_PENDING_KEY, ()):
+        registry._remember(name, id_)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+departments = NameRegistry(Department)
+roles = NameRegistry(Role)
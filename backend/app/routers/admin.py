@@ -6,9 +6,15 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
-from app.models import Complaint, User, ComplaintMessage, ComplaintStatusHistory, ComplaintStatus, Department
-from app.deps import require_roles
-from app.schemas import ComplaintUpdate, AdminComplaintResponse, ComplaintMessageCreate, ComplaintMessageResponse
+from app.models import Complaint, User, ComplaintMessage, ComplaintStatus, Department
+from app.deps import has_role, require_roles
+from app.queries import complaint_by_id
+from app.complaint_status import record_status_change
+from app.admin_responses import C_ADMIN_LABEL, CM_ADMIN_LABEL, format_admin_response, record_admin_response
+from app import profiler
+from app.serialization import json_list_response
+from app.complaint_rows import ADMIN_COMPLAINT_FIELDS, complaint_list_query, admin_complaint_payloads, parse_fields
+from app.schemas import ComplaintUpdate, AdminComplaintListItem, ComplaintMessageCreate, ComplaintMessageResponse
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -32,40 +38,33 @@ def get_admin_stats(current_admin: User = Depends(require_roles("c_admin", "cm_a
         "updated_by_me": updated_by_me
     }
 
+# === SQL PROFILER ===
+@router.get("/profiler/statements")
+def get_profiled_statements(
+    limit: int = 20,
+    current_admin: User = Depends(require_roles("c_admin", "cm_admin"))
+):
+    """Top SQL statements by total time across profiled requests handled by this worker"""
+    return profiler.top_statements(limit)
+
+@router.delete("/profiler/statements", status_code=status.HTTP_204_NO_CONTENT)
+def reset_profiled_statements(current_admin: User = Depends(require_roles("c_admin", "cm_admin"))):
+    """Clear this worker's statement totals"""
+    profiler.reset_statements()
+    return None
+
 # === C-ADMIN ROUTES ===
-@router.get("/c-admin/complaints", response_model=List[AdminComplaintResponse])
+@router.get("/c-admin/complaints", response_model=List[AdminComplaintListItem])
 def get_complaints_for_c_admin(
+    fields: Optional[str] = None,
     admin: User = Depends(require_roles("c_admin")),
     db: Session = Depends(get_db)
 ):
-    """Get all complaints for C-Admin to manage"""
-    complaints = db.query(Complaint).join(User).all()
+    """Get all complaints for C-Admin to manage (text previews; `fields=` selects keys)"""
+    selected = parse_fields(fields, ADMIN_COMPLAINT_FIELDS)
+    rows = db.execute(complaint_list_query(True, selected, newest_first=False))
 
-    result = []
-    for complaint in complaints:
-        complaint_dict = {
-            "id": complaint.id,
-            "user_id": complaint.user_id,
-            "department": complaint.department,
-            "district": getattr(complaint, 'district', None),
-            "subcategory": getattr(complaint, 'subcategory', None),
-            "title": complaint.title,
-            "description": complaint.description,
-            "location": complaint.location,
-            "status": complaint.status.name if hasattr(complaint.status, 'name') else complaint.status,
-            "admin_response": complaint.admin_response,
-            "image_url": complaint.image_path if hasattr(complaint, 'image_path') else None,
-            "voice_url": complaint.voice_path if hasattr(complaint, 'voice_path') else None,
-            "created_at": complaint.created_at,
-            "updated_at": complaint.updated_at,
-            "user_name": complaint.user.name if complaint.user else "Deleted User",
-            "user_email": complaint.user.email if complaint.user else "N/A",
-            "user_phone": complaint.user.phone if complaint.user else "N/A",
-            "user_profile_picture": complaint.user.profile_picture if complaint.user else None
-        }
-        result.append(complaint_dict)
-
-    return result
+    return json_list_response(admin_complaint_payloads(rows, selected))
 
 @router.put("/c-admin/complaints/{complaint_id}")
 def update_complaint_by_c_admin(
@@ -75,7 +74,7 @@ def update_complaint_by_c_admin(
     db: Session = Depends(get_db)
 ):
     """C-Admin can update to pending or in_progress only"""
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     if not complaint:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Complaint not found")
 
@@ -87,11 +86,15 @@ def update_complaint_by_c_admin(
         )
 
     if update_data.status:
-        complaint.status = update_data.status  # type: ignore
+        new_status = ComplaintStatus(update_data.status)
+        if complaint.status != new_status:
+            record_status_change(db, complaint, new_status, admin.id, note=f"Marked {new_status.value} by C-Admin")
         complaint.updated_by_admin = admin.email  # type: ignore
 
-    if update_data.admin_response:
-        complaint.admin_response = update_data.admin_response  # type: ignore
+    # Skip a resubmitted copy of the latest response (older forms prefilled it)
+    response = update_data.admin_response
+    if response and complaint.admin_response not in (response, format_admin_response(C_ADMIN_LABEL, response)):
+        record_admin_response(db, complaint, admin, C_ADMIN_LABEL, update_data.admin_response)
 
     db.commit()
     db.refresh(complaint)
@@ -127,42 +130,23 @@ def get_cm_admin_stats(
         "updated_by_me": solved_by_me
     }
 
-@router.get("/cm-admin/complaints", response_model=List[AdminComplaintResponse])
+@router.get("/cm-admin/complaints", response_model=List[AdminComplaintListItem])
 def get_complaints_for_cm_admin(
+    fields: Optional[str] = None,
     admin: User = Depends(require_roles("cm_admin")),
     db: Session = Depends(get_db)
 ):
-    """Get complaints that CM-Admin can resolve (restricted to their department)"""
+    """Get complaints that CM-Admin can resolve (restricted to their department; text previews, `fields=` selects keys)"""
     if not admin.department_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CM-Admin has no department assigned")
 
-    complaints = db.query(Complaint).filter(Complaint.department_id == admin.department_id).join(User).all()
-
-    result = []
-    for complaint in complaints:
-        complaint_dict = {
-            "id": complaint.id,
-            "user_id": complaint.user_id,
-            "department": complaint.department.name if complaint.department else None,
-            "district": complaint.district,
-            "subcategory": complaint.subcategory,
-            "title": complaint.title,
-            "description": complaint.description,
-            "location": complaint.location,
-            "status": complaint.status.value if hasattr(complaint.status, 'value') else str(complaint.status),
-            "admin_response": complaint.admin_response,
-            "image_url": complaint.image_path,
-            "voice_url": complaint.voice_path,
-            "created_at": complaint.created_at,
-            "updated_at": complaint.updated_at,
-            "user_name": complaint.user.name if complaint.user else "Deleted User",
-            "user_email": complaint.user.email if complaint.user else "N/A",
-            "user_phone": complaint.user.phone if complaint.user else "N/A",
-            "user_profile_picture": complaint.user.profile_picture if complaint.user else None
-        }
-        result.append(complaint_dict)
+    selected = parse_fields(fields, ADMIN_COMPLAINT_FIELDS)
+    rows = db.execute(
+        complaint_list_query(True, selected, ("department_id",), newest_first=False),
+        {"department_id": admin.department_id}
+    )
 
-    return result
+    return json_list_response(admin_complaint_payloads(rows, selected))
 
 @router.put("/cm-admin/complaints/{complaint_id}")
 def update_complaint_by_cm_admin(
@@ -179,7 +163,7 @@ def update_complaint_by_cm_admin(
     if not admin.department_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CM-Admin has no department assigned")
 
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     if not complaint:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Complaint not found")
 
@@ -194,13 +178,7 @@ def update_complaint_by_cm_admin(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use the 'in-progress' endpoint to change status")
 
     if update_data.admin_response:
-        # Append CM-Admin response
-        note = f"[CM-Admin]: {update_data.admin_response}"
-        if complaint.admin_response:
-            complaint.admin_response = f"{complaint.admin_response}\n\n{note}"  # type: ignore
-        else:
-            complaint.admin_response = note  # type: ignore
-        complaint.updated_by_admin = admin.email  # type: ignore
+        record_admin_response(db, complaint, admin, CM_ADMIN_LABEL, update_data.admin_response)
 
     db.commit()
     db.refresh(complaint)
@@ -218,7 +196,7 @@ def mark_complaint_in_progress(
     if not admin.department_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CM-Admin has no department assigned")
 
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     if not complaint:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Complaint not found")
 
@@ -229,20 +207,9 @@ def mark_complaint_in_progress(
     if complaint.status == ComplaintStatus.solved:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cannot change status of solved complaints")
 
-    old_status = complaint.status
-    setattr(complaint, 'status', ComplaintStatus.in_progress)
+    record_status_change(db, complaint, ComplaintStatus.in_progress, admin.id, note="Marked in-progress by CM-Admin")
     complaint.updated_by_admin = admin.email  # type: ignore
 
-    # Add status history
-    history = ComplaintStatusHistory(
-        complaint_id=complaint.id,
-        old_status=old_status,
-        new_status=complaint.status,
-        changed_by=admin.id,
-        note="Marked in-progress by CM-Admin"
-    )
-    db.add(history)
-
     db.commit()
     db.refresh(complaint)
 
@@ -260,7 +227,7 @@ def add_message_to_complaint(
     if not admin.department_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CM-Admin has no department assigned")
 
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     if not complaint:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Complaint not found")
 
@@ -282,7 +249,8 @@ def add_message_to_complaint(
         "sender_id": message.sender_id,
         "message": message.message,
         "created_at": message.created_at,
-        "sender_name": admin.name
+        "sender_name": admin.name,
+        "kind": message.kind
     }
 
 
@@ -295,7 +263,7 @@ def get_messages_for_complaint(
     sender_role: Optional[str] = None
 ):
     """Get all messages for a complaint. Optionally filter by sender_role (e.g., 'cm_admin')"""
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     if not complaint:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Complaint not found")
 
@@ -305,7 +273,7 @@ def get_messages_for_complaint(
     if sender_role:
         filtered = []
         for m in messages:
-            if m.sender and m.sender.role and m.sender.role.name == sender_role:
+            if m.sender and has_role(db, m.sender, sender_role):
                 filtered.append(m)
         messages = filtered
 
@@ -317,7 +285,8 @@ def get_messages_for_complaint(
             "sender_id": m.sender_id,
             "message": m.message,
             "created_at": m.created_at,
-            "sender_name": m.sender.name if m.sender else None
+            "sender_name": m.sender.name if m.sender else None,
+            "kind": m.kind
         })
 
     return result
@@ -331,7 +300,7 @@ def mark_complaint_solved(
     admin_response: Optional[str] = None
 ):
     """Mark a complaint as 'solved'. This action is global and requires c_admin role."""
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     if not complaint:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Complaint not found")
 
@@ -339,27 +308,11 @@ def mark_complaint_solved(
     if complaint.status == ComplaintStatus.solved:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Complaint already solved")
 
-    old_status = complaint.status
-    setattr(complaint, 'status', ComplaintStatus.solved)
+    record_status_change(db, complaint, ComplaintStatus.solved, admin.id, note="Marked solved by C-Admin")
     complaint.updated_by_admin = admin.email  # type: ignore
 
-    # Append c-admin response if provided
     if admin_response:
-        note = f"[C-Admin]: {admin_response}"
-        if complaint.admin_response:
-            setattr(complaint, 'admin_response', f"{complaint.admin_response}\n\n{note}")
-        else:
-            setattr(complaint, 'admin_response', note)
-
-    # Add status history entry
-    history = ComplaintStatusHistory(
-        complaint_id=complaint.id,
-        old_status=old_status,
-        new_status=complaint.status,
-        changed_by=admin.id,
-        note="Marked solved by C-Admin"
-    )
-    db.add(history)
+        record_admin_response(db, complaint, admin, C_ADMIN_LABEL, admin_response)
 
     db.commit()
     db.refresh(complaint)
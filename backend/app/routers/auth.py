@@ -6,40 +6,44 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import User, Role, Department
+from app.models import User
+from app.registry import departments, roles
 from app.schemas import UserCreate, UserLogin, UserResponse, UserUpdate, Token, AdminRegister
 from app.config import settings
 from app.security import get_password_hash, verify_password, create_access_token
 from app.deps import get_current_user
-from pathlib import Path
-from datetime import datetime
-import os
+from app.queries import user_by_email
+from app.media import media_url
+from app.media_uploads import store_image
+from app.storage import key_from_url, storage
+from fastapi.concurrency import run_in_threadpool
+import re
+from typing import Optional
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
-# Utility to get or create a role by name
-def _get_or_create_role(db: Session, role_name: str) -> Role:
-    role = db.query(Role).filter(Role.name == role_name).first()
-    if not role:
-        role = Role(name=role_name)
-        db.add(role)
-        db.commit()
-        db.refresh(role)
-    return role
+
+def _own_picture_key(url: Optional[str], user_id: int) -> Optional[str]:
+    """Storage key of `url` if it is a picture /upload-profile-picture stored for this user"""
+    key = key_from_url(url)
+    if key and re.fullmatch(rf"profile_pictures/profile_{user_id}_\d+_[0-9a-f]+\.[a-z0-9]+", key):
+        return key
+    return None
+
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user_data.email).first():
+    if user_by_email(db, user_data.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    user_role = _get_or_create_role(db, "user")
+    user_role_id = roles.get_or_create(db, "user")
 
     new_user = User(
         name=user_data.name,
         email=user_data.email,
         phone=user_data.phone,
         password=get_password_hash(user_data.password),
-        role_id=user_role.id
+        role_id=user_role_id
     )
     db.add(new_user)
     db.commit()
@@ -56,26 +60,25 @@ def register_admin(admin_data: AdminRegister, db: Session = Depends(get_db)):
     if admin_data.admin_type not in ("c_admin", "cm_admin"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid admin_type")
 
-    if db.query(User).filter(User.email == admin_data.email).first():
+    if user_by_email(db, admin_data.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    role = _get_or_create_role(db, admin_data.admin_type)
+    role_id = roles.get_or_create(db, admin_data.admin_type)
 
     # if cm_admin, department_id is required
     dept_id = None
     if admin_data.admin_type == "cm_admin":
         if not admin_data.department_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="department_id is required for cm_admin")
-        dept = db.query(Department).filter(Department.id == admin_data.department_id).first()
-        if not dept:
+        if departments.name_for(db, admin_data.department_id) is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid department_id")
-        dept_id = dept.id
+        dept_id = admin_data.department_id
 
     new_admin = User(
         name=admin_data.name,
         email=admin_data.email,
         password=get_password_hash(admin_data.password),
-        role_id=role.id,
+        role_id=role_id,
         department_id=dept_id
     )
     db.add(new_admin)
@@ -85,20 +88,20 @@ def register_admin(admin_data: AdminRegister, db: Session = Depends(get_db)):
 
 @router.post("/login", response_model=Token)
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = user_by_email(db, form_data.username)
     if not user or not verify_password(form_data.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials", headers={"WWW-Authenticate": "Bearer"})
 
-    token = create_access_token({"sub": user.email, "role": user.role.name, "user_id": user.id})
+    token = create_access_token({"sub": user.email, "role": user.role_name, "user_id": user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/login/json", response_model=Token)
 def login_json(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = user_by_email(db, credentials.email)
     if not user or not verify_password(credentials.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    token = create_access_token({"sub": user.email, "role": user.role.name, "user_id": user.id})
+    token = create_access_token({"sub": user.email, "role": user.role_name, "user_id": user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
@@ -120,8 +123,7 @@ def update_me(update: UserUpdate, current_user: User = Depends(get_current_user)
         current_user.age = update.age
     if update.gender is not None:
         current_user.gender = update.gender
-    if update.profile_picture is not None:
-        current_user.profile_picture = update.profile_picture
+    # profile_picture is only set by /upload-profile-picture
 
     db.commit()
     db.refresh(current_user)
@@ -135,23 +137,19 @@ async def upload_profile_picture(file: UploadFile = File(...), current_user: Use
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file must be an image")
 
     content = await file.read()
-    if len(content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Image size must be less than 5MB")
-
-    upload_dir = Path("uploads/profile_pictures")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
-    extension = Path(file.filename or "profile.jpg").suffix
-    timestamp = int(datetime.utcnow().timestamp())
-    filename = f"profile_{current_user.id}_{timestamp}{extension}"
-    file_path = upload_dir / filename
-
-    with open(file_path, "wb") as f:
-        f.write(content)
+    picture_url = await store_image(
+        content, "profile_pictures", "profile", current_user.id, settings.PROFILE_IMAGE_MAX_DIMENSION
+    )
 
     # Save relative path to DB
-    current_user.profile_picture = f"/uploads/profile_pictures/{filename}"
+    previous = current_user.profile_picture
+    current_user.profile_picture = picture_url
     db.commit()
     db.refresh(current_user)
 
-    return {"profile_picture": current_user.profile_picture}
+    # Remove the replaced picture (anything missed here is left for gc_uploads.py)
+    previous_key = _own_picture_key(previous, current_user.id)
+    if previous_key:
+        await run_in_threadpool(storage.delete, previous_key)
+
+    return {"profile_picture": media_url(current_user.profile_picture)}
@@ -1,20 +1,35 @@
 """
 Complaint routes - handles complaint operations
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, status, UploadFile, File, Form
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy import select, union_all, literal, cast, null, String
 from typing import List, Optional
 from jose import JWTError, jwt  # type: ignore
 from datetime import datetime
-import os
-import shutil
-from pathlib import Path
 
 from app.database import get_db
-from app.models import Complaint, User, Department, ComplaintStatus
-from app.schemas import ComplaintCreate, ComplaintResponse
-from app.deps import get_current_user
+from app.models import Complaint, User, ComplaintStatus, ComplaintMessage, ComplaintStatusHistory
+from app.schemas import ComplaintCreate, ComplaintListItem, ComplaintResponse, ComplaintTimelineEntry, MyComplaintsPage
+from app.deps import get_current_user, has_role
+from app.queries import complaint_by_id, user_by_email
+from app.complaint_status import record_status_change
+from app.registry import departments
+from app import user_stats
+from app.audio import transcode_voice, transcoding_available
+from app.media_uploads import (
+    attach_incoming_image, attach_incoming_voice, delete_incoming, store_image, store_voice_upload
+)
+from app.storage import key_from_url, storage
+from app.serialization import DEFAULT_RESPONSE_CLASS, json_list_response
+from app.idempotency import (
+    claim_key, complete_key, find_recent_duplicate, release_key, request_fingerprint, upload_digest
+)
+from app.complaint_rows import (
+    COMPLAINT_FIELDS, ComplaintRow, complaint_list_query, user_feed_query, fetch_complaint_row, complaint_payloads,
+    parse_fields, to_complaint_payload
+)
 from app.config import settings
 
 router = APIRouter(prefix="/api/complaints", tags=["Complaints"])
@@ -60,7 +75,7 @@ def get_current_user_optional(
         return None
     
     # Find user by email
-    user = db.query(User).filter(User.email == email).first()
+    user = user_by_email(db, email)
     return user
 
 
@@ -70,6 +85,7 @@ def get_current_user_optional(
 
 @router.post("/", response_model=ComplaintResponse, status_code=status.HTTP_201_CREATED)
 async def create_complaint(
+    background_tasks: BackgroundTasks,
     department: str = Form(...),
     district: str = Form(...),
     subcategory: str = Form(...),
@@ -78,6 +94,10 @@ async def create_complaint(
     location: Optional[str] = Form(None),
     image: Optional[UploadFile] = File(None),
     voice_recording: Optional[UploadFile] = File(None),
+    image_key: Optional[str] = Form(None),
+    voice_key: Optional[str] = Form(None),
+    keep_original_audio: bool = Form(False),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: User = Depends(get_current_user),  # Authentication required
     db: Session = Depends(get_db)
 ):
@@ -88,132 +108,135 @@ async def create_complaint(
 
     Steps:
     1. Get current user from JWT token
-    2. Handle file uploads (image and voice)
+    2. Handle file uploads (image and voice), sent here or uploaded directly to
+       storage beforehand (image_key / voice_key, see /api/uploads/presign)
     3. Resolve Department (create if missing) and create complaint linked to user
     4. Return created complaint
-    """
-    image_url = None
-    voice_url = None
 
+    Send an `Idempotency-Key` header to make retries safe (see app/idempotency.py).
+    """
     # ========================================
-    # Handle Image Upload
+    # Retries: Idempotency-Key replay and near-duplicate check (before any upload)
     # ========================================
-    if image:
-        # Validate file type
-        if not image.content_type or not image.content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Uploaded file must be an image (JPG, PNG, etc.)"
+    if idempotency_key is not None:
+        fingerprint = request_fingerprint((
+            department, district, subcategory, title, description, location,
+            await upload_digest(image) if image else image_key,
+            await upload_digest(voice_recording) if voice_recording else voice_key
+        ))
+        existing_id = claim_key(db, current_user.id, idempotency_key, fingerprint)
+        if existing_id is not None:
+            row = fetch_complaint_row(db, existing_id)
+            if row is None:
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail="The complaint created with this Idempotency-Key no longer exists"
+                )
+            return DEFAULT_RESPONSE_CLASS(
+                to_complaint_payload(row),
+                status_code=status.HTTP_201_CREATED,
+                headers={"Idempotent-Replayed": "true"}
             )
 
-        # Validate file size (max 5MB)
-        content = await image.read()
-        if len(content) > 5 * 1024 * 1024:  # 5MB
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Image size must be less than 5MB"
-            )
-
-        # Create uploads directory
-        upload_dir = Path("uploads/complaints")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-
-        # Generate unique filename
-        file_extension = Path(image.filename or "image.jpg").suffix
-        timestamp = int(datetime.utcnow().timestamp())
-        filename = f"complaint_{current_user.id}_{timestamp}{file_extension}"
-        file_path = upload_dir / filename
-
-        # Save file
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-
-        image_url = f"/uploads/complaints/{filename}"
+    duplicate_id = find_recent_duplicate(db, current_user.id, title, description)
+    if duplicate_id is not None:
+        if idempotency_key is not None:
+            release_key(db, current_user.id, idempotency_key)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"You already submitted this complaint (id {duplicate_id})"
+        )
 
-    # ========================================
-    # Handle Voice Recording Upload
-    # ========================================
-    if voice_recording:
-        # Validate file type
-        if not voice_recording.content_type or not voice_recording.content_type.startswith('audio/'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Uploaded file must be an audio file"
+    try:
+        image_url = None
+        voice_url = None
+        voice_info = None
+        incoming_keys = []
+
+        # ========================================
+        # Handle Image Upload (a file, or the key of a direct upload)
+        # ========================================
+        if image:
+            # Validate file type
+            if not image.content_type or not image.content_type.startswith('image/'):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Uploaded file must be an image (JPG, PNG, etc.)"
+                )
+
+            # Validate size, then decode, strip metadata, downsize, re-encode and store
+            content = await image.read()
+            image_url = await store_image(
+                content, "complaints", "complaint", current_user.id, settings.IMAGE_MAX_DIMENSION
             )
+        elif image_key:
+            image_url = await attach_incoming_image(
+                image_key, current_user.id, "complaints", "complaint", settings.IMAGE_MAX_DIMENSION
+            )
+            incoming_keys.append(image_key)
+
+        # ========================================
+        # Handle Voice Recording Upload (a file, or the key of a direct upload)
+        # ========================================
+        if voice_recording:
+            voice_url, voice_info = await store_voice_upload(voice_recording, current_user.id)
+        elif voice_key:
+            voice_url, voice_info = await attach_incoming_voice(voice_key, current_user.id)
+            incoming_keys.append(voice_key)
+
+        # ========================================
+        # Resolve Department (create if missing) and create complaint in one commit
+        # ========================================
+        # Registry hit needs no query; a new name is inserted in this transaction
+        department_id = departments.get_or_create(db, department)
+
+        new_complaint = Complaint(
+            user_id=current_user.id,
+            department_id=department_id,
+            district=district,
+            subcategory=subcategory,
+            title=title,
+            description=description,
+            location=location,
+            image_path=image_url,
+            voice_path=voice_url,
+            voice_duration_seconds=voice_info.duration if voice_info else None,
+            voice_sample_rate=voice_info.sample_rate if voice_info else None
+        )
 
-        # Create uploads directory
-        upload_dir = Path("uploads/voice_recordings")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-
-        # Generate unique filename
-        file_extension = Path(voice_recording.filename or "recording.wav").suffix
-        timestamp = int(datetime.utcnow().timestamp())
-        filename = f"voice_{current_user.id}_{timestamp}{file_extension}"
-        file_path = upload_dir / filename
-
-        # Save file
-        content = await voice_recording.read()
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
+        # Adds the complaint and its first history entry (None -> pending)
+        record_status_change(db, new_complaint, ComplaintStatus.pending, current_user.id, note="Complaint submitted")
+        if idempotency_key is not None:
+            complete_key(db, current_user.id, idempotency_key, new_complaint.id)
+        db.commit()
+        db.refresh(new_complaint)
+    except BaseException:
+        # Let a retry with the same key start over (files already stored are left to gc_uploads.py)
+        if idempotency_key is not None:
+            release_key(db, current_user.id, idempotency_key)
+        raise
 
-        voice_url = f"/uploads/voice_recordings/{filename}"
+    # Direct uploads are copied, not moved, so a failure above leaves them for a retry
+    if incoming_keys:
+        background_tasks.add_task(delete_incoming, incoming_keys)
 
-    # ========================================
-    # Resolve Department (create if missing) and create complaint
-    # ========================================
-    dept = db.query(Department).filter(Department.name == department).first()
-    if not dept:
-        dept = Department(name=department)
-        db.add(dept)
-        db.commit()
-        db.refresh(dept)
-
-    new_complaint = Complaint(
-        user_id=current_user.id,
-        department_id=dept.id,
-        district=district,
-        subcategory=subcategory,
-        title=title,
-        description=description,
-        location=location,
-        status=ComplaintStatus.pending,
-        image_path=image_url,
-        voice_path=voice_url
-    )
-
-    db.add(new_complaint)
-    db.commit()
-    db.refresh(new_complaint)
+    # Re-encode the recording to Opus/Ogg after the response is sent
+    if voice_url and transcoding_available():
+        background_tasks.add_task(transcode_voice, new_complaint.id, voice_url, keep_original_audio)
 
     # Map DB values to the expected response schema (image_url / voice_url)
-    return {
-        "id": new_complaint.id,
-        "user_id": new_complaint.user_id,
-        "department": dept.name,
-        "district": new_complaint.district,
-        "subcategory": new_complaint.subcategory,
-        "title": new_complaint.title,
-        "description": new_complaint.description,
-        "location": new_complaint.location,
-        "status": new_complaint.status.value if hasattr(new_complaint.status, 'value') else str(new_complaint.status),
-        "admin_response": new_complaint.admin_response,
-        "image_url": new_complaint.image_path,
-        "voice_url": new_complaint.voice_path,
-        "created_at": new_complaint.created_at,
-        "updated_at": new_complaint.updated_at,
-        "user_name": current_user.name,
-        "user_profile_picture": current_user.profile_picture
-    }
+    return to_complaint_payload(ComplaintRow.from_complaint(new_complaint, department, current_user))
 
 
 # ========================================
 # GET ALL COMPLAINTS (Public - No Authentication Required)
 # ========================================
 
-@router.get("/", response_model=List[ComplaintResponse])
+@router.get("/", response_model=List[ComplaintListItem])
 def get_all_complaints(
     department: Optional[str] = None,
     status_filter: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)  # Optional auth
 ):
@@ -225,82 +248,76 @@ def get_all_complaints(
     Query Parameters:
     - department: Filter by department name (optional)
     - status_filter: Filter by status - pending, in_progress, solved (optional)
+    - fields: Comma-separated keys to return, e.g. `id,title,status` (optional)
 
-    Returns: List of all complaints ordered by most recent first
+    Returns: List of all complaints ordered by most recent first. description and
+    admin_response are previews (`truncated` is set when cut); GET /{id} has the full text.
     """
-    # Start with base query
-    query = db.query(Complaint).join(Department)
+    selected = parse_fields(fields, COMPLAINT_FIELDS)
 
-    # Apply filters if provided
+    # Filters if provided (one prebuilt statement per combination)
+    filters = {}
     if department:
-        query = query.filter(Department.name == department)
+        department_id = departments.id_for(db, department)
+        if department_id is None:
+            return json_list_response([])
+        filters["department_id"] = department_id
 
     if status_filter:
         try:
-            status_enum = ComplaintStatus(status_filter)
-            query = query.filter(Complaint.status == status_enum)
-        except Exception:
-            # fall back to comparing by string value
-            query = query.filter(Complaint.status == status_filter)
-
-    # Order by most recent first
-    complaints = query.order_by(Complaint.created_at.desc()).all()
-
-    # Populate user info and convert to dict for schema compatibility
-    result = []
-    for c in complaints:
-        complaint_data = {
-            "id": c.id,
-            "user_id": c.user_id,
-            "department": c.department.name if c.department else None,
-            "district": c.district,
-            "subcategory": c.subcategory,
-            "title": c.title,
-            "description": c.description,
-            "location": c.location,
-            "status": c.status.value if hasattr(c.status, 'value') else str(c.status),
-            "admin_response": c.admin_response,
-            "image_url": c.image_path,
-            "voice_url": c.voice_path,
-            "created_at": c.created_at,
-            "updated_at": c.updated_at,
-            "user_name": c.user.name if c.user else "Anonymous",
-            "user_profile_picture": c.user.profile_picture if c.user else None
-        }
-        result.append(complaint_data)
-            
-    return result
+            filters["status"] = ComplaintStatus(status_filter)
+        except ValueError:
+            # Unknown status: nothing can match
+            return json_list_response([])
+
+    # Most recent first
+    rows = db.execute(complaint_list_query(True, selected, tuple(filters)), filters)
 
-@router.get("/me", response_model=List[ComplaintResponse])
+    return json_list_response(complaint_payloads(rows, selected))
+
+def _feed_cursor(row) -> str:
+    return f"{row.created_at.isoformat()},{row.id}"
+
+
+def _parse_feed_cursor(cursor: str):
+    try:
+        created_at, complaint_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(complaint_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/me", response_model=MyComplaintsPage)
 def get_my_complaints(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    complaints = db.query(Complaint).filter(Complaint.user_id == current_user.id).order_by(Complaint.created_at.desc()).all()
-
-    result = []
-    for c in complaints:
-        complaint_data = {
-            "id": c.id,
-            "user_id": c.user_id,
-            "department": c.department.name if c.department else None,
-            "district": c.district,
-            "subcategory": c.subcategory,
-            "title": c.title,
-            "description": c.description,
-            "location": c.location,
-            "status": c.status.value if hasattr(c.status, 'value') else str(c.status),
-            "admin_response": c.admin_response,
-            "image_url": c.image_path,
-            "voice_url": c.voice_path,
-            "created_at": c.created_at,
-            "updated_at": c.updated_at,
-            "user_name": current_user.name,
-            "user_profile_picture": current_user.profile_picture
-        }
-        result.append(complaint_data)
-        
-    return result
+    """
+    The current user's complaints, newest first, one page at a time.
+
+    Query Parameters:
+    - limit: Complaints per page (1-100, default 20)
+    - cursor: `next_cursor` of the previous page (optional)
+    - fields: Comma-separated keys to return per complaint (optional)
+
+    Returns: `summary` (counts per status and the last update, kept per user on every
+    write), `items` (previews, like GET /) and `next_cursor` (None on the last page).
+    """
+    selected = parse_fields(fields, COMPLAINT_FIELDS)
+    params = {"user_id": current_user.id, "limit": limit + 1}
+    if cursor:
+        params["cursor_created_at"], params["cursor_id"] = _parse_feed_cursor(cursor)
+    rows = db.execute(user_feed_query(selected, bool(cursor)), params).all()
+
+    page = rows[:limit]
+    return DEFAULT_RESPONSE_CLASS(content={
+        "summary": user_stats.summary(db, current_user.id),
+        "items": complaint_payloads(page, selected),
+        "next_cursor": _feed_cursor(page[-1]) if len(rows) > limit else None
+    })
 
 
 # ========================================
@@ -318,32 +335,90 @@ def get_complaint(
 
     Public endpoint - anyone can view any complaint details.
     """
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    row = fetch_complaint_row(db, complaint_id)
 
-    if not complaint:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Complaint with ID {complaint_id} not found"
         )
 
-    return {
-        "id": complaint.id,
-        "user_id": complaint.user_id,
-        "department": complaint.department.name if complaint.department else None,
-        "district": complaint.district,
-        "subcategory": complaint.subcategory,
-        "title": complaint.title,
-        "description": complaint.description,
-        "location": complaint.location,
-        "status": complaint.status.value if hasattr(complaint.status, 'value') else str(complaint.status),
-        "admin_response": complaint.admin_response,
-        "image_url": complaint.image_path,
-        "voice_url": complaint.voice_path,
-        "created_at": complaint.created_at,
-        "updated_at": complaint.updated_at,
-        "user_name": complaint.user.name if complaint.user else "Anonymous",
-        "user_profile_picture": complaint.user.profile_picture if complaint.user else None
-    }
+    return to_complaint_payload(row)
+
+
+# ========================================
+# COMPLAINT TIMELINE (Owner or Admin)
+# ========================================
+
+@router.get("/{complaint_id}/timeline", response_model=List[ComplaintTimelineEntry])
+def get_complaint_timeline(
+    complaint_id: int,
+    current_user: User = Depends(get_current_user),  # Authentication required
+    db: Session = Depends(get_db)
+):
+    """
+    Get status changes and messages for a complaint as one ordered stream.
+
+    Required Authentication: Yes
+    Permissions: Complaint owner or any admin
+
+    Both sources are read with a single UNION ALL query served by the
+    (complaint_id, time) indexes on each table.
+    """
+    owner_id = db.query(Complaint.user_id).filter(Complaint.id == complaint_id).scalar()
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Complaint not found"
+        )
+
+    is_admin = has_role(db, current_user, "c_admin", "cm_admin")
+    if owner_id != current_user.id and not is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only view the timeline of your own complaints"
+        )
+
+    status_entries = select(
+        literal("status").label("kind"),
+        ComplaintStatusHistory.id.label("id"),
+        ComplaintStatusHistory.timestamp.label("timestamp"),
+        ComplaintStatusHistory.changed_by.label("actor_id"),
+        cast(ComplaintStatusHistory.old_status, String).label("old_status"),
+        cast(ComplaintStatusHistory.new_status, String).label("new_status"),
+        ComplaintStatusHistory.note.label("text")
+    ).where(ComplaintStatusHistory.complaint_id == complaint_id)
+
+    message_entries = select(
+        ComplaintMessage.kind.label("kind"),
+        ComplaintMessage.id.label("id"),
+        ComplaintMessage.created_at.label("timestamp"),
+        ComplaintMessage.sender_id.label("actor_id"),
+        cast(null(), String).label("old_status"),
+        cast(null(), String).label("new_status"),
+        ComplaintMessage.message.label("text")
+    ).where(ComplaintMessage.complaint_id == complaint_id)
+
+    entries = union_all(status_entries, message_entries).subquery()
+    rows = db.execute(
+        select(entries, User.name.label("actor_name"))
+        .outerjoin(User, User.id == entries.c.actor_id)
+        .order_by(entries.c.timestamp.asc(), entries.c.kind.desc(), entries.c.id.asc())
+    ).all()
+
+    return [
+        {
+            "kind": row.kind,
+            "id": row.id,
+            "timestamp": row.timestamp,
+            "actor_id": row.actor_id,
+            "actor_name": row.actor_name,
+            "old_status": row.old_status,
+            "new_status": row.new_status,
+            "text": row.text
+        }
+        for row in rows
+    ]
 
 
 # ========================================
@@ -364,7 +439,7 @@ def update_complaint(
     Required Authentication: Yes
     Permissions: Only complaint owner can update
     """
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
 
     if not complaint:
         raise HTTPException(
@@ -395,24 +470,9 @@ def update_complaint(
     db.commit()
     db.refresh(complaint)
 
-    return {
-        "id": complaint.id,
-        "user_id": complaint.user_id,
-        "department": complaint.department.name if complaint.department else None,
-        "district": complaint.district,
-        "subcategory": complaint.subcategory,
-        "title": complaint.title,
-        "description": complaint.description,
-        "location": complaint.location,
-        "status": complaint.status.value if hasattr(complaint.status, 'value') else str(complaint.status),
-        "admin_response": complaint.admin_response,
-        "image_url": complaint.image_path,
-        "voice_url": complaint.voice_path,
-        "created_at": complaint.created_at,
-        "updated_at": complaint.updated_at,
-        "user_name": current_user.name,
-        "user_profile_picture": current_user.profile_picture
-    }
+    return to_complaint_payload(ComplaintRow.from_complaint(
+        complaint, complaint.department.name if complaint.department else None, current_user
+    ))
 
 
 # ========================================
@@ -432,7 +492,7 @@ def delete_complaint(
     Permissions: Only complaint owner can delete
     Restriction: Can only delete if status is 'pending'
     """
-    complaint = db.query(Complaint).filter(Complaint.id == complaint_id).first()
+    complaint = complaint_by_id(db, complaint_id)
     
     if not complaint:
         raise HTTPException(
@@ -448,25 +508,22 @@ def delete_complaint(
         )
     
     # Only allow deletion if status is pending
-    if complaint.status != "pending":
+    if complaint.status != ComplaintStatus.pending:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot delete complaint after it has been processed"
         )
     
-    # Delete associated files if they exist
-    if complaint.image_path:
-        image_path = Path(f".{complaint.image_path}")
-        if image_path.exists():
-            image_path.unlink()
-    
-    if complaint.voice_path:
-        voice_path = Path(f".{complaint.voice_path}")
-        if voice_path.exists():
-            voice_path.unlink()
-    
+    stored_keys = [
+        key_from_url(path)
+        for path in (complaint.image_path, complaint.voice_path, complaint.voice_original_path)
+    ]
+
     # Delete complaint from database
     db.delete(complaint)
     db.commit()
+
+    # Delete associated files once the row is gone
+    storage.delete_many([key for key in stored_keys if key])
     
     return None
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Direct upload routes - presigned uploads straight to object storage
+The client uploads the file to storage itself, so the API never proxies the bytes,
+then passes the returned key to the complaint endpoint (image_key / voice_key).
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.deps import get_current_user
+from app.media_uploads import IMAGE_MAX_BYTES, incoming_key, voice_max_bytes
+from app.models import User
+from app.schemas import PresignedUploadRequest, PresignedUploadResponse
+from app.storage import storage
+
+router = APIRouter(prefix="/api/uploads", tags=["Uploads"])
+
+
+@router.post("/presign", response_model=PresignedUploadResponse)
+async def presign_upload(request: PresignedUploadRequest, current_user: User = Depends(get_current_user)):
+    """Presigned POST for one image or voice recording (S3 storage backend only)"""
+    if not storage.supports_presigned_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Direct uploads are not available; send the file to the complaint endpoint"
+        )
+
+    if request.kind == "image":
+        prefix, max_bytes, label = "image/", IMAGE_MAX_BYTES, "Image size must be less than 5MB"
+    elif request.kind == "voice":
+        prefix, max_bytes = "audio/", voice_max_bytes()
+        label = f"Voice recording must be less than {settings.VOICE_MAX_UPLOAD_MB}MB"
+    else:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="kind must be 'image' or 'voice'")
+
+    if not request.content_type.startswith(prefix):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"content_type must be {prefix}*")
+    if request.size <= 0 or request.size > max_bytes:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=label)
+
+    key = incoming_key(current_user.id, request.content_type)
+    presigned = await run_in_threadpool(storage.presign_upload, key, request.content_type, max_bytes)
+    return {
+        "key": key,
+        "url": presigned["url"],
+        "fields": presigned["fields"],
+        "expires_in": settings.STORAGE_PRESIGN_TTL_SECONDS
+    }
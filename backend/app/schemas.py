@@ -2,9 +2,12 @@
 Pydantic schemas for request/response validation
 These define the structure of data coming in and going out of our API
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_serializer
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
+from typing_extensions import TypedDict
+
+from app.media import media_url
 
 # ===== USER SCHEMAS =====
 class UserBase(BaseModel):
@@ -24,7 +27,6 @@ class UserUpdate(BaseModel):
     address: Optional[str] = None
     age: Optional[int] = None
     gender: Optional[str] = None
-    profile_picture: Optional[str] = None
 
 class UserResponse(UserBase):
     """Schema for user response (without password)"""
@@ -37,6 +39,10 @@ class UserResponse(UserBase):
     profile_picture: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+
+    @field_serializer("profile_picture")
+    def serialize_profile_picture(self, value: Optional[str]) -> Optional[str]:
+        return media_url(value)
     
     class Config:
         from_attributes = True
@@ -96,12 +102,61 @@ class ComplaintResponse(ComplaintBase):
     admin_response: Optional[str] = None
     image_url: Optional[str] = None
     voice_url: Optional[str] = None
+    voice_duration_seconds: Optional[float] = None
     created_at: datetime
     updated_at: datetime
+    # True when list views cut description/admin_response to a preview;
+    # GET /api/complaints/{id} always returns the full text
+    truncated: bool = False
 
     class Config:
         from_attributes = True
     
+class ComplaintListItem(BaseModel):
+    """One complaint in a list response (GET /api/complaints/, /me).
+
+    Lists return text previews (`truncated` is set when cut), and with `fields=` only
+    the selected keys are present, so every key here is optional.
+    """
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    department: Optional[str] = None
+    district: Optional[str] = None
+    subcategory: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    status: Optional[str] = None
+    admin_response: Optional[str] = None
+    image_url: Optional[str] = None
+    voice_url: Optional[str] = None
+    voice_duration_seconds: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    user_name: Optional[str] = None
+    user_profile_picture: Optional[str] = None
+    truncated: Optional[bool] = None
+
+class AdminComplaintListItem(ComplaintListItem):
+    """One complaint in an admin list response; keys depend on `fields=` as above"""
+    user_email: Optional[str] = None
+    user_phone: Optional[str] = None
+
+class ComplaintSummary(BaseModel):
+    """Counts per status of one user's complaints (from user_complaint_stats)"""
+    total: int
+    pending: int
+    in_progress: int
+    solved: int
+    last_updated_at: Optional[datetime] = None
+
+class MyComplaintsPage(BaseModel):
+    """GET /api/complaints/me: summary plus one page of complaints, newest first"""
+    summary: ComplaintSummary
+    items: List[ComplaintListItem]
+    # Pass as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
 class AdminComplaintResponse(ComplaintResponse):
     """Detailed complaint schema for admin view (includes user info)"""
     user_name: Optional[str] = None
@@ -111,6 +166,33 @@ class AdminComplaintResponse(ComplaintResponse):
     class Config:
         from_attributes = True
 
+# Plain-dict shapes of the complaint responses above. List endpoints build these
+# dicts themselves and serialize them directly (app.serialization) instead of
+# validating every row through the models a second time.
+class ComplaintPayload(TypedDict):
+    id: int
+    user_id: int
+    department: Optional[str]
+    district: Optional[str]
+    subcategory: Optional[str]
+    title: str
+    description: str
+    location: Optional[str]
+    status: str
+    admin_response: Optional[str]
+    image_url: Optional[str]
+    voice_url: Optional[str]
+    voice_duration_seconds: Optional[float]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    user_name: Optional[str]
+    user_profile_picture: Optional[str]
+    truncated: bool
+
+class AdminComplaintPayload(ComplaintPayload):
+    user_email: Optional[str]
+    user_phone: Optional[str]
+
 # ===== MESSAGE SCHEMAS =====
 class ComplaintMessageCreate(BaseModel):
     message: str
@@ -122,10 +204,38 @@ class ComplaintMessageResponse(BaseModel):
     message: str
     created_at: datetime
     sender_name: Optional[str] = None
+    kind: str = "message"  # or 'admin_response'
 
     class Config:
         from_attributes = True
 
+# ===== TIMELINE SCHEMAS =====
+class ComplaintTimelineEntry(BaseModel):
+    """One entry in a complaint's timeline: a status change, a message or an admin response"""
+    kind: str  # 'status', 'message' or 'admin_response'
+    id: int
+    timestamp: datetime
+    actor_id: Optional[int] = None
+    actor_name: Optional[str] = None
+    old_status: Optional[str] = None
+    new_status: Optional[str] = None
+    text: Optional[str] = None  # status note or message body
+
+# ===== UPLOAD SCHEMAS =====
+class PresignedUploadRequest(BaseModel):
+    """Ask for a direct-to-storage upload of one complaint attachment"""
+    kind: str  # 'image' or 'voice'
+    content_type: str
+    size: int
+
+class PresignedUploadResponse(BaseModel):
+    """POST `fields` plus the file (as the last form field) to `url`, then send
+    `key` as image_key / voice_key when creating the complaint"""
+    key: str
+    url: str
+    fields: Dict[str, str]
+    expires_in: int
+
 # ===== TOKEN SCHEMAS =====
 class Token(BaseModel):
     """Schema for JWT token response"""
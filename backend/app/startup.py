@@ -0,0 +1,254 @@
+"""
+One-time startup work: create tables, patch older schemas, seed roles and admins
+`app.main` runs this on import unless SKIP_STARTUP_TASKS is set. `serve.py` runs it
+once per deployment (`python -m app.startup`) before starting the workers, so they
+do not repeat the DDL and seeding.
+"""
+import os
+import sys
+
+from sqlalchemy import exists, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, engine
+from app.models import User, Complaint, ComplaintMessage, ComplaintStatusHistory, UserComplaintStats
+from app.registry import roles
+from app.security import get_password_hash
+from app.storage import remove_stale_temp_dirs
+from app import user_stats
+
+# Scratch directories untouched for this long belong to processes that were killed
+STALE_TEMP_DIR_SECONDS = 6 * 3600
+
+
+def ensure_role_column_and_defaults():
+    """Make sure `users.role_id` column exists and populate defaults for existing rows.
+
+    This is a safe, idempotent startup helper to avoid failures when upgrading the schema
+    without running migrations in development environments.
+    """
+    # Use an explicit connection and transactional block
+    with engine.begin() as conn:
+        # If model has new user columns, add them if missing (safe upgrades for dev)
+        conn.execute(text("""
+            DO $$
+            BEGIN
+                -- Add role_id
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name='users' AND column_name='role_id'
+                ) THEN
+                    ALTER TABLE users ADD COLUMN role_id INTEGER;
+                END IF;
+
+                -- Add department_id
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name='users' AND column_name='department_id'
+                ) THEN
+                    ALTER TABLE users ADD COLUMN department_id INTEGER;
+                END IF;
+
+                -- Add created_at and updated_at timestamps
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name='users' AND column_name='created_at'
+                ) THEN
+                    ALTER TABLE users ADD COLUMN created_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+                END IF;
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name='users' AND column_name='updated_at'
+                ) THEN
+                    ALTER TABLE users ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+                END IF;
+
+                -- Add profile_picture if missing
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name='users' AND column_name='profile_picture'
+                ) THEN
+                    ALTER TABLE users ADD COLUMN profile_picture VARCHAR(255);
+                END IF;
+
+                -- Ensure phone column is nullable (for admin users)
+                ALTER TABLE users ALTER COLUMN phone DROP NOT NULL;
+
+            END;
+            $$;
+        """))
+
+        # Ensure a 'user' role exists
+        conn.execute(text("INSERT INTO roles (name) SELECT 'user' WHERE NOT EXISTS (SELECT 1 FROM roles WHERE name='user')"))
+
+        # Set role_id for any existing users to the 'user' role (use raw UPDATE to avoid ORM-managed timestamp side-effects)
+        conn.execute(text("UPDATE users SET role_id = (SELECT id FROM roles WHERE name='user' LIMIT 1) WHERE role_id IS NULL"))
+
+        # Optionally add a foreign key constraint if not present
+        conn.execute(text("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu ON tc.constraint_name = kcu.constraint_name
+                    WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_name = 'users' AND kcu.column_name = 'role_id'
+                ) THEN
+                    ALTER TABLE users ADD CONSTRAINT users_role_id_fkey FOREIGN KEY (role_id) REFERENCES roles(id) ON DELETE SET NULL;
+                END IF;
+
+                -- Add FK for department_id if missing
+                IF NOT EXISTS (
+                    SELECT 1 FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu ON tc.constraint_name = kcu.constraint_name
+                    WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_name = 'users' AND kcu.column_name = 'department_id'
+                ) THEN
+                    ALTER TABLE users ADD CONSTRAINT users_department_id_fkey FOREIGN KEY (department_id) REFERENCES departments(id) ON DELETE SET NULL;
+                END IF;
+            END;
+            $$;
+        """))
+
+
+# Columns added to existing tables after their first release: name -> DDL type
+ADDED_COLUMNS = {
+    "complaints": {
+        "voice_duration_seconds": "FLOAT",
+        "voice_sample_rate": "INTEGER",
+        "voice_original_path": "VARCHAR(500)",
+        "version": "INTEGER NOT NULL DEFAULT 1",
+    },
+    "complaint_messages": {
+        "kind": "VARCHAR(20) NOT NULL DEFAULT 'message'",
+    },
+}
+
+
+def ensure_added_columns():
+    """Add columns from ADDED_COLUMNS that `create_all` skips for existing tables."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl_type in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+
+
+def ensure_indexes():
+    """Create indexes declared on models that `create_all` skips for existing tables."""
+    with engine.begin() as conn:
+        for model in (Complaint, ComplaintMessage, ComplaintStatusHistory):
+            for index in model.__table__.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def ensure_user_stats() -> int:
+    """Fill user_complaint_stats from `complaints` when it is empty (first start after
+    the table was added); from then on the ORM events keep it current"""
+    with engine.begin() as conn:
+        if conn.execute(select(exists().select_from(UserComplaintStats))).scalar():
+            return 0
+        return user_stats.rebuild(conn)
+
+
+def create_default_roles_and_admins():
+    """Ensure roles exist and create default C-Admin and CM-Admin users if missing"""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    try:
+        # Ensure standard roles exist (this also loads the role registry)
+        role_ids = {name: roles.get_or_create(db, name) for name in ("user", "c_admin", "cm_admin")}
+        db.commit()
+
+        # Ensure any existing users without a role get the 'user' role
+        try:
+            # Use a raw UPDATE to avoid touching ORM-managed timestamps if the schema differs
+            db.execute(text("UPDATE users SET role_id = :rid WHERE role_id IS NULL"), {"rid": role_ids["user"]})
+            db.commit()
+        except Exception:
+            # Best-effort: ignore if DB schema differs; seeding step should be idempotent
+            db.rollback()
+
+        # Default admins
+        c_admin_email = "c.admin@voiceoftn.com"
+        cm_admin_email = "cm.admin@voiceoftn.com"
+
+        # Create C-Admin
+        if not db.query(User).filter(User.email == c_admin_email).first():
+            db.add(User(
+                name="C-Admin (Complaint Handler)",
+                email=c_admin_email,
+                password=get_password_hash("cadmin123"),
+                role_id=role_ids["c_admin"]
+            ))
+            print("[OK] Created C-Admin user")
+        else:
+            print("[OK] C-Admin user already exists")
+
+        # Create CM-Admin
+        if not db.query(User).filter(User.email == cm_admin_email).first():
+            db.add(User(
+                name="CM-Admin (Chief Manager)",
+                email=cm_admin_email,
+                password=get_password_hash("cmadmin123"),
+                role_id=role_ids["cm_admin"]
+            ))
+            print("[OK] Created CM-Admin user")
+        else:
+            print("[OK] CM-Admin user already exists")
+
+        db.commit()
+
+    except Exception as e:
+        print(f"Warning: Could not create default roles/admins: {e}")
+    finally:
+        db.close()
+
+
+def run_startup_tasks():
+    """Create tables and run every idempotent schema/seed step"""
+    Base.metadata.create_all(bind=engine)
+    print("[OK] Created database tables")
+
+    # Ensure upload directories exist (local storage only)
+    if settings.STORAGE_BACKEND == "local":
+        for upload_dir in ("profile_pictures", "complaints", "voice_recordings"):
+            os.makedirs(os.path.join(settings.LOCAL_STORAGE_ROOT, upload_dir), exist_ok=True)
+
+    removed = remove_stale_temp_dirs(STALE_TEMP_DIR_SECONDS)
+    if removed:
+        print(f"[OK] Removed {removed} stale upload temp dir(s)")
+
+    # Ensure role column and defaults before seeding admins
+    try:
+        ensure_role_column_and_defaults()
+    except Exception as e:
+        print(f"Warning: Could not ensure role column/defaults: {e}")
+
+    try:
+        ensure_added_columns()
+    except Exception as e:
+        print(f"Warning: Could not add new columns: {e}")
+
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"Warning: Could not ensure indexes: {e}")
+
+    try:
+        filled = ensure_user_stats()
+        if filled:
+            print(f"[OK] Counted complaints for {filled} users")
+    except Exception as e:
+        print(f"Warning: Could not fill user complaint stats: {e}")
+
+    create_default_roles_and_admins()
+
+
+if __name__ == "__main__":
+    try:
+        run_startup_tasks()
+    except Exception as e:
+        print(f"Startup tasks failed: {e}")
+        sys.exit(1)
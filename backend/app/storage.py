@@ -0,0 +1,334 @@
+"""
+Object storage for uploaded media
+Files are addressed by keys such as `complaints/complaint_5_1769157668_ab12cd34.webp`.
+The database keeps the public path `/uploads/<key>` (see url_for_key / key_from_url),
+so stored paths do not change with the backend.
+
+- LocalStorage: files under LOCAL_STORAGE_ROOT (default `uploads/`). Several API
+  nodes can share it over a network filesystem; /uploads is served by MediaFiles.
+- S3Storage: any S3-compatible service (AWS S3, MinIO, ...) via boto3, an optional
+  dependency. Objects live under S3_PREFIX (default `uploads/`), so pointing
+  MEDIA_BASE_URL at the bucket (or a CDN in front of it) keeps media URLs working.
+  Large files are sent with multipart uploads, and clients can upload directly to
+  the bucket with presigned POSTs (see app/routers/uploads.py).
+
+All methods block; call them through run_in_threadpool from async code.
+
+Upload spools and scratch copies go to a per-process directory (temp_dir()), which
+graceful shutdown removes together with any half-written `.part` files, so a
+restart under load leaves nothing behind.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+from app.config import settings
+
+try:
+    import boto3  # type: ignore  # optional dependency
+    from boto3.s3.transfer import TransferConfig  # type: ignore
+    from botocore.exceptions import ClientError  # type: ignore
+except ImportError:
+    boto3 = None
+
+URL_PREFIX = "/uploads/"
+COPY_CHUNK_SIZE = 1024 * 1024
+MULTIPART_CHUNK_SIZE = 8 * 1024 * 1024
+TEMP_DIR_PREFIX = "voiceoftn-"
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float  # unix timestamp
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def url_for_key(key: str) -> str:
+    return URL_PREFIX + key
+
+
+def _valid_key(key: str) -> bool:
+    return bool(key) and ".." not in PurePosixPath(key).parts
+
+
+def key_from_url(url: Optional[str]) -> Optional[str]:
+    """Stored path (/uploads/complaints/x.webp, possibly absolute or signed) -> complaints/x.webp
+
+    None for anything that is not a plain key, including paths with `..` parts.
+    """
+    if not url or URL_PREFIX not in url:
+        return None
+    key = url.split(URL_PREFIX, 1)[1].split("?", 1)[0]
+    return key if _valid_key(key) else None
+
+
+def _temp_root() -> Path:
+    return Path(settings.UPLOAD_TEMP_DIR or tempfile.gettempdir())
+
+
+def temp_dir() -> Path:
+    """This process's scratch directory for upload spools and transcoding"""
+    path = _temp_root() / f"{TEMP_DIR_PREFIX}{os.getpid()}"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def remove_temp_dir():
+    shutil.rmtree(_temp_root() / f"{TEMP_DIR_PREFIX}{os.getpid()}", ignore_errors=True)
+
+
+def remove_stale_temp_dirs(max_age_seconds: float) -> int:
+    """Remove scratch directories of processes that died without cleaning up.
+
+    Age-based, because the temp root may be shared by several workers; a live
+    process recreates its directory on the next use.
+    """
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in _temp_root().glob(f"{TEMP_DIR_PREFIX}*"):
+        try:
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def spool_to_tempfile(source: BinaryIO, max_bytes: Optional[int] = None, suffix: str = "") -> Path:
+    """Copy an upload stream to a temporary file in chunks, enforcing a size limit"""
+    fd, name = tempfile.mkstemp(suffix=suffix, prefix="upload-", dir=temp_dir())
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                out.write(chunk)
+    except BaseException:
+        os.unlink(name)
+        raise
+    return Path(name)
+
+
+class LocalStorage:
+    name = "local"
+    supports_presigned_uploads = False
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        # `.part` files this process is writing, removed on shutdown if still there
+        self._partials = set()
+        self._partials_lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        if not _valid_key(key):
+            raise ValueError(f"Invalid storage key: {key}")
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    @contextmanager
+    def _partial_for(self, key: str) -> Iterator[Path]:
+        """Write to `<key>.part` and rename over the key, so readers never see half a file"""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        with self._partials_lock:
+            self._partials.add(partial)
+        try:
+            yield partial
+            os.replace(partial, path)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            with self._partials_lock:
+                self._partials.discard(partial)
+
+    def remove_partials(self) -> int:
+        """Delete `.part` files of writes still running (called on shutdown)"""
+        with self._partials_lock:
+            partials, self._partials = self._partials, set()
+        for partial in partials:
+            partial.unlink(missing_ok=True)
+        return len(partials)
+
+    def save_bytes(self, key: str, data: bytes, content_type: Optional[str] = None):
+        with self._partial_for(key) as partial:
+            partial.write_bytes(data)
+
+    def save_file(self, key: str, source: Path, content_type: Optional[str] = None):
+        """Store a local file under `key`; the source file is moved, not copied"""
+        with self._partial_for(key) as partial:
+            shutil.move(str(source), partial)
+
+    def read_bytes(self, key: str, max_bytes: Optional[int] = None) -> bytes:
+        path = self.path(key)
+        if max_bytes is not None and path.stat().st_size > max_bytes:
+            raise UploadTooLarge(f"{key} exceeds {max_bytes} bytes")
+        return path.read_bytes()
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        yield self.path(key)
+
+    def copy(self, source_key: str, target_key: str):
+        source = self.path(source_key)
+        with self._partial_for(target_key) as partial:
+            shutil.copyfile(source, partial)
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def delete(self, key: str):
+        self.path(key).unlink(missing_ok=True)
+
+    def delete_many(self, keys: List[str]):
+        for key in keys:
+            self.delete(key)
+
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        base = self.root / prefix
+        if not base.is_dir():
+            return
+        for path in base.rglob("*"):
+            if path.is_file():
+                stat = path.stat()
+                yield StoredObject(path.relative_to(self.root).as_posix(), stat.st_size, stat.st_mtime)
+
+    def presign_upload(self, key: str, content_type: str, max_bytes: int) -> Dict:
+        raise NotImplementedError("Direct uploads need the S3 storage backend")
+
+
+class S3Storage:
+    name = "s3"
+    supports_presigned_uploads = True
+
+    def __init__(self, bucket: str, prefix: str = "uploads/", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_CHUNK_SIZE, multipart_chunksize=MULTIPART_CHUNK_SIZE
+        )
+
+    def _object_key(self, key: str) -> str:
+        if not _valid_key(key):
+            raise ValueError(f"Invalid storage key: {key}")
+        return self.prefix + key
+
+    def remove_partials(self) -> int:
+        # Objects appear atomically; multipart uploads cut off by a kill are left to
+        # the bucket's AbortIncompleteMultipartUpload lifecycle rule
+        return 0
+
+    def save_bytes(self, key: str, data: bytes, content_type: Optional[str] = None):
+        extra = {"ContentType": content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data, **extra)
+
+    def save_file(self, key: str, source: Path, content_type: Optional[str] = None):
+        """Upload a local file (multipart above 8 MB) and remove the local copy"""
+        self.client.upload_file(
+            str(source), self.bucket, self._object_key(key),
+            ExtraArgs={"ContentType": content_type} if content_type else None, Config=self.transfer_config
+        )
+        Path(source).unlink(missing_ok=True)
+
+    def read_bytes(self, key: str, max_bytes: Optional[int] = None) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        if max_bytes is not None and response["ContentLength"] > max_bytes:
+            response["Body"].close()
+            raise UploadTooLarge(f"{key} exceeds {max_bytes} bytes")
+        return response["Body"].read()
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        fd, name = tempfile.mkstemp(suffix=PurePosixPath(key).suffix, prefix="media-", dir=temp_dir())
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self._object_key(key), name, Config=self.transfer_config)
+            yield Path(name)
+        finally:
+            Path(name).unlink(missing_ok=True)
+
+    def copy(self, source_key: str, target_key: str):
+        self.client.copy(
+            {"Bucket": self.bucket, "Key": self._object_key(source_key)},
+            self.bucket, self._object_key(target_key), Config=self.transfer_config
+        )
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def delete_many(self, keys: List[str]):
+        for start in range(0, len(keys), 1000):
+            objects = [{"Key": self._object_key(key)} for key in keys[start:start + 1000]]
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+
+    def iter_objects(self, prefix: str) -> Iterator[StoredObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix)):
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"][len(self.prefix):], item["Size"], item["LastModified"].timestamp())
+
+    def presign_upload(self, key: str, content_type: str, max_bytes: int) -> Dict:
+        """Presigned POST the browser can send the file to; returns {"url", "fields"}"""
+        return self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_bytes]],
+            ExpiresIn=settings.STORAGE_PRESIGN_TTL_SECONDS
+        )
+
+
+def build_storage():
+    if settings.STORAGE_BACKEND == "s3":
+        if not settings.S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(
+            settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY
+        )
+    return LocalStorage(settings.LOCAL_STORAGE_ROOT)
+
+
+storage = build_storage()
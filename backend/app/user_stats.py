@@ -0,0 +1,112 @@
+"""
+Per-user complaint counters (user_complaint_stats)
+The profile page shows a user's counts per status and when their complaints last
+changed. Counting the complaints on every visit costs a scan per heavy reporter, so
+the counts live in one row per user, adjusted by the mapper events below whenever
+the ORM inserts, updates or deletes a complaint. The adjustment is an atomic
+`col = col + delta` upsert in the same transaction as the complaint write, so it
+commits or rolls back with it.
+
+Writes that bypass the ORM (bulk_import.py, bench/seed.py) call rebuild() for the
+users they touched; startup fills the table once when it is empty.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Complaint, ComplaintStatus, UserComplaintStats
+
+_STATS = UserComplaintStats.__table__
+_COUNTERS = ("total", "pending", "in_progress", "solved")
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _apply(connection: Connection, user_id: int, deltas: dict, last_updated_at: Optional[datetime]):
+    """Add `deltas` ({counter: +-n}) to the user's row, creating it if needed"""
+    values = {"user_id": user_id, **{name: deltas.get(name, 0) for name in _COUNTERS}}
+    if last_updated_at is not None:
+        values["last_updated_at"] = last_updated_at
+    dialect_insert = _UPSERT_INSERTS.get(connection.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(_STATS).values(**values)
+        set_ = {name: _STATS.c[name] + statement.excluded[name] for name in _COUNTERS}
+        if last_updated_at is not None:
+            set_["last_updated_at"] = statement.excluded.last_updated_at
+        connection.execute(statement.on_conflict_do_update(index_elements=[_STATS.c.user_id], set_=set_))
+        return
+    changes = {name: _STATS.c[name] + values[name] for name in _COUNTERS}
+    if last_updated_at is not None:
+        changes["last_updated_at"] = last_updated_at
+    if not connection.execute(update(_STATS).where(_STATS.c.user_id == user_id).values(**changes)).rowcount:
+        connection.execute(insert(_STATS).values(**values))
+
+
+def _status_name(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.name if isinstance(value, ComplaintStatus) else ComplaintStatus(value).name
+
+
+@event.listens_for(Complaint, "after_insert")
+def _complaint_inserted(mapper, connection, target: Complaint):
+    deltas = {"total": 1, _status_name(target.status or ComplaintStatus.pending): 1}
+    _apply(connection, target.user_id, deltas, target.updated_at or target.created_at)
+
+
+@event.listens_for(Complaint, "after_update")
+def _complaint_updated(mapper, connection, target: Complaint):
+    deltas = {}
+    history = inspect(target).attrs.status.history
+    if history.has_changes():
+        old = _status_name(history.deleted[0]) if history.deleted else None
+        new = _status_name(target.status)
+        if old != new:
+            if old is not None:
+                deltas[old] = -1
+            deltas[new] = 1
+    _apply(connection, target.user_id, deltas, target.updated_at)
+
+
+@event.listens_for(Complaint, "after_delete")
+def _complaint_deleted(mapper, connection, target: Complaint):
+    history = inspect(target).attrs.status.history
+    status = history.deleted[0] if history.deleted else target.status
+    _apply(connection, target.user_id, {"total": -1, _status_name(status): -1}, None)
+
+
+def rebuild(connection: Connection, user_ids: Optional[Iterable[int]] = None) -> int:
+    """Recount from `complaints` for `user_ids` (all users if None); returns rows written"""
+    counts = select(
+        Complaint.user_id,
+        func.count(Complaint.id),
+        *(func.sum(case((Complaint.status == status, 1), else_=0)) for status in ComplaintStatus),
+        func.max(Complaint.updated_at),
+    ).group_by(Complaint.user_id)
+    clear = delete(_STATS)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        counts = counts.where(Complaint.user_id.in_(user_ids))
+        clear = clear.where(_STATS.c.user_id.in_(user_ids))
+    connection.execute(clear)
+    columns = ["user_id", "total", *(status.name for status in ComplaintStatus), "last_updated_at"]
+    return connection.execute(insert(_STATS).from_select(columns, counts)).rowcount
+
+
+def summary(db: Session, user_id: int) -> dict:
+    """The profile header: counts per status and the last change of any complaint"""
+    row = db.get(UserComplaintStats, user_id)
+    if row is None:
+        return {"total": 0, "pending": 0, "in_progress": 0, "solved": 0, "last_updated_at": None}
+    return {
+        "total": row.total,
+        "pending": row.pending,
+        "in_progress": row.in_progress,
+        "solved": row.solved,
+        "last_updated_at": row.last_updated_at,
+    }
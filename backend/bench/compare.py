@@ -0,0 +1,57 @@
+"""
+Compare two load test result files
+
+    python -m bench.compare results/baseline.json results/candidate.json --threshold 10
+
+Prints per-endpoint p50/p95/p99 and throughput deltas and exits with status 1 when
+any endpoint's p95 or throughput regressed by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+
+def _delta(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> bool:
+    regressed = False
+    print(f"{'endpoint':<42} {'p50 %':>8} {'p95 %':>8} {'p99 %':>8} {'rps %':>8}")
+    for name, before in baseline["endpoints"].items():
+        after = candidate["endpoints"].get(name)
+        if after is None:
+            print(f"{name:<42} (missing from candidate)")
+            continue
+        p50 = _delta(before["p50_ms"], after["p50_ms"])
+        p95 = _delta(before["p95_ms"], after["p95_ms"])
+        p99 = _delta(before["p99_ms"], after["p99_ms"])
+        rps = _delta(before["throughput_rps"], after["throughput_rps"])
+        flag = ""
+        if p95 > threshold or rps < -threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{name:<42} {p50:>+8.1f} {p95:>+8.1f} {p99:>+8.1f} {rps:>+8.1f}{flag}")
+    total = _delta(baseline["total"]["throughput_rps"], candidate["total"]["throughput_rps"])
+    print(f"total throughput: {total:+.1f}%")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare load test results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    sys.exit(1 if compare(baseline, candidate, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
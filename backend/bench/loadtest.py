@@ -0,0 +1,240 @@
+"""
+Load test for the complaint API
+
+    python -m bench.loadtest --duration 30 --concurrency 20 --out results/baseline.json
+    python -m bench.loadtest --base-url http://127.0.0.1:8000 --duration 60   # against a running server
+
+Without --base-url the real FastAPI app is driven in-process through httpx's ASGI
+transport (rate limiting is switched off for the run). Each virtual user picks
+scenarios by weight: public feed reads, complaint detail, logins, complaint
+creation with an image upload, and admin triage. Latency percentiles and
+throughput per endpoint are printed and saved as JSON for bench.compare.
+
+Seed data first with `python -m bench.seed`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.seed import BENCH_EMAIL, BENCH_PASSWORD
+
+
+def make_png(width: int = 64, height: int = 64) -> bytes:
+    """Small valid RGB PNG (gradient) used for upload scenarios"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(
+        b"\x00" + bytes(channel for x in range(width) for channel in (x * 4 % 256, y * 4 % 256, 128))
+        for y in range(height)
+    )
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+UPLOAD_PNG = make_png()
+
+SCENARIO_WEIGHTS = {
+    "feed": 50,
+    "detail": 20,
+    "login": 5,
+    "create": 10,
+    "my_complaints": 10,
+    "admin_triage": 5,
+}
+
+C_ADMIN = ("c.admin@voiceoftn.com", "cadmin123")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, name: str, elapsed: float, ok: bool):
+        self.latencies.setdefault(name, []).append(elapsed)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, dict]:
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            result[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "throughput_rps": round(len(values) / wall_seconds, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return result
+
+
+async def timed(recorder: Recorder, name: str, coro, expected=(200,)):
+    start = time.perf_counter()
+    try:
+        response = await coro
+        ok = response.status_code in expected
+    except httpx.HTTPError:
+        response, ok = None, False
+    recorder.record(name, time.perf_counter() - start, ok)
+    return response
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> Optional[str]:
+    response = await client.post("/api/auth/login/json", json={"email": email, "password": password})
+    if response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def virtual_user(client, recorder, rng, deadline, user_token, admin_token, user_email, complaint_ids):
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    user_headers = {"Authorization": f"Bearer {user_token}"} if user_token else {}
+    admin_headers = {"Authorization": f"Bearer {admin_token}"} if admin_token else {}
+
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        if scenario == "feed":
+            await timed(recorder, "GET /api/complaints/", client.get("/api/complaints/"))
+        elif scenario == "detail" and complaint_ids:
+            complaint_id = rng.choice(complaint_ids)
+            await timed(recorder, "GET /api/complaints/{id}", client.get(f"/api/complaints/{complaint_id}"))
+        elif scenario == "login":
+            await timed(recorder, "POST /api/auth/login/json", client.post(
+                "/api/auth/login/json", json={"email": user_email, "password": BENCH_PASSWORD}
+            ))
+        elif scenario == "create" and user_token:
+            response = await timed(recorder, "POST /api/complaints/", client.post(
+                "/api/complaints/",
+                headers=user_headers,
+                data={
+                    "department": "Water Supply",
+                    "district": "Chennai",
+                    "subcategory": "leak",
+                    "title": "Load test complaint",
+                    "description": "Pipe leaking near the bus stop " * rng.randrange(1, 10),
+                },
+                files={"image": ("photo.png", UPLOAD_PNG, "image/png")}
+            ), expected=(201,))
+            if response is not None and response.status_code == 201:
+                complaint_ids.append(response.json()["id"])
+        elif scenario == "my_complaints" and user_token:
+            await timed(recorder, "GET /api/complaints/me", client.get("/api/complaints/me", headers=user_headers))
+        elif scenario == "admin_triage" and admin_token:
+            await timed(recorder, "GET /api/admin/c-admin/complaints",
+                        client.get("/api/admin/c-admin/complaints", headers=admin_headers))
+            if complaint_ids:
+                complaint_id = rng.choice(complaint_ids)
+                await timed(recorder, "PUT /api/admin/c-admin/complaints/{id}", client.put(
+                    f"/api/admin/c-admin/complaints/{complaint_id}",
+                    headers=admin_headers,
+                    json={"status": "in_progress"}
+                ), expected=(200, 400, 409))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def run(base_url: Optional[str], duration: float, concurrency: int, users: int, random_seed: int) -> dict:
+    if base_url:
+        transport = None
+    else:
+        # app.config.settings already exists (bench.seed imports it), so an environment
+        # variable set here would be too late; the middleware reads this on import
+        from app.config import settings
+        settings.RATE_LIMIT_ENABLED = False
+        from app.main import app
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        base_url = "http://bench"
+
+    rng = random.Random(random_seed)
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, timeout=60) as client:
+        # Warm-up: log in the virtual users once and collect complaint ids
+        emails = [BENCH_EMAIL.format(rng.randrange(users)) for _ in range(concurrency)]
+        tokens = await asyncio.gather(*(login(client, email, BENCH_PASSWORD) for email in emails))
+        admin_token = await login(client, *C_ADMIN)
+        feed = await client.get("/api/complaints/")
+        complaint_ids = [c["id"] for c in feed.json()[:500]] if feed.status_code == 200 else []
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            virtual_user(client, recorder, random.Random(random_seed + n), deadline,
+                         tokens[n], admin_token, emails[n], complaint_ids)
+            for n in range(concurrency)
+        ))
+        wall = time.perf_counter() - started
+
+    endpoints = recorder.summary(wall)
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "mode": "in-process" if transport else "http",
+            "duration_s": round(wall, 2),
+            "concurrency": concurrency,
+        },
+        "total": {"requests": total, "throughput_rps": round(total / wall, 2)},
+        "endpoints": endpoints,
+    }
+
+
+def print_report(result: dict):
+    print(f"{'endpoint':<42} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, e in result["endpoints"].items():
+        print(f"{name:<42} {e['requests']:>7} {e['errors']:>5} {e['throughput_rps']:>8} "
+              f"{e['p50_ms']:>8} {e['p95_ms']:>8} {e['p99_ms']:>8}")
+    print(f"total: {result['total']['requests']} requests, {result['total']['throughput_rps']} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the complaint API")
+    parser.add_argument("--base-url", help="target a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--users", type=int, default=500, help="number of seeded bench users to log in as")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.base_url, args.duration, args.concurrency, args.users, args.seed))
+    print_report(result)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[OK] Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Seed the configured database (DATABASE_URL) with benchmark data
+
+    python -m bench.seed --users 2000 --complaints 50000 --messages 2 --history 2
+
+Bench users are `bench_user_<n>@example.com` with password `benchpass`. Rows are
+inserted in batches with executemany; the same password hash is reused because
+bcrypt would otherwise dominate seeding time.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app import user_stats
+from app.database import Base, SessionLocal, engine
+from app.models import (
+    Complaint, ComplaintMessage, ComplaintStatus, ComplaintStatusHistory, Department, Role, User
+)
+from app.security import get_password_hash
+
+BENCH_PASSWORD = "benchpass"
+BENCH_EMAIL = "bench_user_{}@example.com"
+DEPARTMENT_NAMES = [
+    "Public Works", "Water Supply", "Electricity", "Sanitation", "Roads", "Health",
+    "Education", "Transport", "Revenue", "Police", "Fire Services", "Parks"
+]
+DISTRICTS = ["Chennai", "Coimbatore", "Madurai", "Salem", "Tiruchirappalli", "Tirunelveli", "Vellore", "Erode"]
+WORDS = ("water pipe leak road damage street light broken garbage not collected drainage overflow "
+         "power cut pothole bus stop school wall hospital queue").split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _batches(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def seed(users: int, departments: int, complaints: int, messages: int, history: int,
+         batch_size: int = 1000, random_seed: int = 42):
+    rng = random.Random(random_seed)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        for role_name in ("user", "c_admin", "cm_admin"):
+            if not db.execute(select(Role.id).where(Role.name == role_name)).scalar():
+                db.add(Role(name=role_name))
+        db.commit()
+        user_role_id = db.execute(select(Role.id).where(Role.name == "user")).scalar_one()
+
+        # Departments
+        existing = set(db.execute(select(Department.name)).scalars())
+        names = (DEPARTMENT_NAMES + [f"Department {n}" for n in range(departments)])[:departments]
+        new_departments = [{"name": n} for n in names if n not in existing]
+        if new_departments:
+            db.execute(insert(Department), new_departments)
+        dept_ids = list(db.execute(select(Department.id)).scalars())
+
+        # Users
+        first_user = db.execute(
+            select(func.count(User.id)).where(User.email.like(BENCH_EMAIL.format("%")))
+        ).scalar() or 0
+        password_hash = get_password_hash(BENCH_PASSWORD)
+        now = datetime.utcnow()
+        user_rows = [
+            {
+                "name": f"Bench User {first_user + n}",
+                "email": BENCH_EMAIL.format(first_user + n),
+                "phone": f"9{rng.randrange(10**9):09d}",
+                "password": password_hash,
+                "role_id": user_role_id,
+                "created_at": now,
+                "updated_at": now
+            }
+            for n in range(users)
+        ]
+        for batch in _batches(user_rows, batch_size):
+            db.execute(insert(User), batch)
+        db.commit()
+        user_ids = list(db.execute(select(User.id).where(User.role_id == user_role_id)).scalars())
+        admin_id = db.execute(select(User.id).where(User.role_id != user_role_id).limit(1)).scalar() or user_ids[0]
+
+        # Complaints spread over the last year, older ones more likely solved
+        statuses = list(ComplaintStatus)
+        complaint_rows = []
+        for _ in range(complaints):
+            created = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+            age_days = (now - created).days
+            weights = (1, 1, 1 + age_days / 30)
+            complaint_rows.append({
+                "user_id": rng.choice(user_ids),
+                "department_id": rng.choice(dept_ids),
+                "title": _text(rng, 5).capitalize(),
+                "description": _text(rng, rng.randrange(20, 120)),
+                "location": f"{rng.randrange(1, 200)} Main Road",
+                "district": rng.choice(DISTRICTS),
+                "subcategory": rng.choice(WORDS),
+                "status": rng.choices(statuses, weights)[0],
+                "created_at": created,
+                "updated_at": created
+            })
+        for batch in _batches(complaint_rows, batch_size):
+            db.execute(insert(Complaint), batch)
+        db.commit()
+
+        complaint_ids = list(db.execute(select(Complaint.id).order_by(Complaint.id.desc()).limit(complaints)).scalars())
+        message_rows = []
+        history_rows = []
+        for complaint_id in complaint_ids:
+            for _ in range(messages):
+                message_rows.append({
+                    "complaint_id": complaint_id,
+                    "sender_id": admin_id,
+                    "message": _text(rng, rng.randrange(5, 40)),
+                    "created_at": now
+                })
+            for step in range(history):
+                history_rows.append({
+                    "complaint_id": complaint_id,
+                    "old_status": statuses[step - 1] if step else None,
+                    "new_status": statuses[min(step, len(statuses) - 1)],
+                    "changed_by": admin_id,
+                    "note": "seeded",
+                    "timestamp": now
+                })
+        for batch in _batches(message_rows, batch_size):
+            db.execute(insert(ComplaintMessage), batch)
+        for batch in _batches(history_rows, batch_size):
+            db.execute(insert(ComplaintStatusHistory), batch)
+        # Bulk inserts skip the ORM events that maintain the per-user counters
+        user_stats.rebuild(db.connection())
+        db.commit()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    total = len(user_rows) + len(complaint_rows) + len(message_rows) + len(history_rows)
+    print(f"[OK] Seeded {len(user_rows)} users, {len(complaint_rows)} complaints, "
+          f"{len(message_rows)} messages, {len(history_rows)} history rows "
+          f"in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed benchmark data")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--departments", type=int, default=12)
+    parser.add_argument("--complaints", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=1, help="messages per complaint")
+    parser.add_argument("--history", type=int, default=2, help="status history rows per complaint")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    seed(args.users, args.departments, args.complaints, args.messages, args.history, args.batch_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
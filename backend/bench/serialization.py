@@ -0,0 +1,96 @@
+"""
+Serialization benchmark for complaint list payloads
+
+    python -m bench.serialization --sizes 1000 10000 --repeat 5
+
+Compares what a list endpoint costs to turn rows into JSON bytes:
+- before: response_model validation of every row, then jsonable output and stdlib json
+  (what FastAPI does for a returned list of dicts)
+- adapter: one TypeAdapter.dump_json pass over the pre-shaped dicts, no validation
+- after: orjson over the pre-shaped dicts (app.serialization.json_list_response)
+No database is needed; rows are synthetic.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.schemas import ComplaintPayload, ComplaintResponse
+from app.serialization import json_list_response
+
+# Built once, as the app would at startup
+VALIDATING_ADAPTER = TypeAdapter(List[ComplaintResponse])
+PAYLOAD_ADAPTER = TypeAdapter(List[ComplaintPayload])
+
+
+def make_rows(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "id": n,
+            "user_id": n % 500,
+            "department": "Water Supply",
+            "district": "Chennai",
+            "subcategory": "leak",
+            "title": f"Pipe leaking on street {n}",
+            "description": "Water has been leaking from the main pipe for three days. " * 4,
+            "location": f"{n % 200} Main Road",
+            "status": ("pending", "in_progress", "solved")[n % 3],
+            "admin_response": "[C-Admin]: Forwarded to the department" if n % 2 else None,
+            "image_url": f"/uploads/complaints/complaint_{n}_1769157668.png",
+            "voice_url": None,
+            "voice_duration_seconds": None,
+            "created_at": now - timedelta(minutes=n),
+            "updated_at": now,
+            "user_name": f"User {n % 500}",
+            "user_profile_picture": None,
+        }
+        for n in range(count)
+    ]
+
+
+def before(rows: List[dict]) -> bytes:
+    validated = VALIDATING_ADAPTER.validate_python(rows)
+    content = VALIDATING_ADAPTER.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def adapter(rows: List[dict]) -> bytes:
+    return PAYLOAD_ADAPTER.dump_json(rows)
+
+
+def after(rows: List[dict]) -> bytes:
+    return json_list_response(rows).body
+
+
+def best_of(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark complaint list serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'before ms':>10} {'adapter ms':>11} {'after ms':>10} {'speedup':>8} {'bytes':>10}")
+    for size in args.sizes:
+        rows = make_rows(size)
+        assert json.loads(before(rows)) == json.loads(adapter(rows)) == json.loads(after(rows))
+        t_before = best_of(before, rows, args.repeat)
+        t_adapter = best_of(adapter, rows, args.repeat)
+        t_after = best_of(after, rows, args.repeat)
+        print(f"{size:>8} {t_before * 1000:>10.2f} {t_adapter * 1000:>11.2f} {t_after * 1000:>10.2f} "
+              f"{t_before / t_after:>7.1f}x {len(after(rows)):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Worker scaling benchmark for serve.py
+
+    python -m bench.workers --workers 1 2 4 8 --duration 60 --concurrency 64 --out bench/results/workers.json
+
+For each worker count, starts `serve.py` on a local port (rate limiting off), runs the
+regular load test against it over HTTP and stops it again. Prints total throughput
+and p95 latency per worker count, and the speed-up relative to the first count.
+
+The load generator is a single asyncio process on the same host: watch its CPU use.
+If it saturates before the server does, run serve.py on its own machine and point
+`bench.loadtest --base-url` at it for each worker count instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench.loadtest import run
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "RATE_LIMIT_ENABLED": "false"}
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with status {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=2).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("serve.py did not become healthy within 120s")
+
+
+def stop_server(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def p95_of(result: dict) -> float:
+    """Request-weighted p95 across endpoints"""
+    endpoints = result["endpoints"].values()
+    total = sum(e["requests"] for e in endpoints) or 1
+    return round(sum(e["p95_ms"] * e["requests"] for e in endpoints) / total, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure throughput per serve.py worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=60, help="seconds per worker count")
+    parser.add_argument("--concurrency", type=int, default=64, help="virtual users")
+    parser.add_argument("--users", type=int, default=500, help="number of seeded bench users to log in as")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for workers in args.workers:
+        print(f"--- {workers} worker(s)")
+        process = start_server(workers, args.port)
+        try:
+            result = asyncio.run(run(
+                f"http://127.0.0.1:{args.port}", args.duration, args.concurrency, args.users, args.seed
+            ))
+        finally:
+            stop_server(process)
+        errors = sum(e["errors"] for e in result["endpoints"].values())
+        results.append({
+            "workers": workers,
+            "throughput_rps": result["total"]["throughput_rps"],
+            "p95_ms": p95_of(result),
+            "errors": errors,
+            "run": result,
+        })
+
+    base = results[0]["throughput_rps"] or 1
+    print(f"{'workers':>7} {'rps':>10} {'speed-up':>9} {'p95 ms':>9} {'errors':>7}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['throughput_rps']:>10} {r['throughput_rps'] / base:>8.2f}x "
+              f"{r['p95_ms']:>9} {r['errors']:>7}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "concurrency": args.concurrency, "results": results}, f, indent=2)
+        print(f"[OK] Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Bulk import of departments, users and historical complaints
+
+Usage:
+    python bulk_import.py departments departments.csv
+    python bulk_import.py users district_users.csv --hash-workers 8
+    python bulk_import.py complaints complaints.ndjson --batch-size 10000
+
+Input is CSV with a header row, or NDJSON (one object per line), chosen by the file
+extension or --format. Columns:
+    departments  name, description
+    users        name, email, password (plain text) or password_hash, phone, address,
+                 age, gender, role (default user), department (for cm_admin), created_at
+    complaints   user_email or user_id, department, title, description, location,
+                 district, subcategory, status (default pending), admin_response,
+                 created_at, updated_at
+
+Rows are streamed in batches, one transaction per batch. On PostgreSQL each batch is
+loaded with COPY (users and departments through a temp table, so rows that already
+exist are skipped with ON CONFLICT DO NOTHING); other databases use executemany.
+Passwords are hashed in a pool of processes, since bcrypt dominates a user import,
+and only for emails not in the database yet. Departments and roles are resolved
+through a map built once up front; unknown departments are created, like complaint
+submission does. Imported complaints get no status history or messages; the
+per-user complaint counters of their authors are recounted with each batch.
+Run from the backend directory.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import Table, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from app import user_stats
+from app.database import Base, SessionLocal, engine
+from app.models import Complaint, ComplaintStatus, Department, User
+from app.registry import departments, roles
+from app.security import get_password_hash
+
+COPY_NULL = r"\N"
+ON_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def read_rows(path: str, fmt: str) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield {key: (value if value != "" else None) for key, value in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _datetime(value, default: datetime) -> datetime:
+    return datetime.fromisoformat(value) if value else default
+
+
+def _copy_value(value):
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, ComplaintStatus):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def _copy(cursor, sql: str, buffer: io.StringIO):
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        cursor.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def write_rows(conn: Connection, table: Table, rows: List[dict], conflict: Optional[str] = None) -> int:
+    """Insert `rows` (dicts with the same keys); returns the number inserted"""
+    if not rows:
+        return 0
+    columns = list(rows[0])
+    dialect = conn.dialect.name
+
+    if dialect == "postgresql":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+        column_list = ", ".join(columns)
+        cursor = conn.connection.cursor()
+        try:
+            if conflict is None:
+                _copy(cursor, f"COPY {table.name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+                return len(rows)
+            staging = f"{table.name}_import"
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS "
+                f"SELECT {column_list} FROM {table.name} WITH NO DATA"
+            )
+            _copy(cursor, f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            cursor.execute(
+                f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging} "
+                f"ON CONFLICT ({conflict}) DO NOTHING"
+            )
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    dialect_insert = ON_CONFLICT_INSERTS.get(dialect)
+    if conflict is not None and dialect_insert is not None:
+        statement = dialect_insert(table).on_conflict_do_nothing(index_elements=[conflict])
+    else:
+        statement = insert(table)
+    return conn.execute(statement, rows).rowcount
+
+
+class Importer:
+    def __init__(self, batch_size: int, hash_workers: int):
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.department_ids: Dict[str, int] = {}
+        self.role_ids: Dict[str, int] = {}
+        self.read = self.inserted = self.skipped = 0
+        self.hash_seconds = 0.0
+
+    def load_maps(self):
+        db = SessionLocal()
+        try:
+            self.department_ids = dict(db.execute(select(Department.name, Department.id)).all())
+            # Built-in roles, created on a fresh database as app.startup does
+            self.role_ids = {name: roles.get_or_create(db, name) for name in ("user", "c_admin", "cm_admin")}
+            db.commit()
+        finally:
+            db.close()
+
+    def add_missing_departments(self, batch: List[dict]):
+        """Create departments the batch names that the prebuilt map lacks; runs before
+        the batch's transaction, which on SQLite would otherwise block this commit"""
+        missing = {row["department"].strip() for row in batch if row.get("department")} - set(self.department_ids)
+        if not missing:
+            return
+        db = SessionLocal()
+        try:
+            created = {name: departments.get_or_create(db, name) for name in sorted(missing)}
+            db.commit()
+            self.department_ids.update(created)
+        finally:
+            db.close()
+
+    def skip(self, reason: str):
+        self.skipped += 1
+        if self.skipped <= 20:
+            print(f"Warning: skipped row: {reason}")
+
+    def hash_passwords(self, passwords: List[str]) -> List[str]:
+        started = time.perf_counter()
+        if self.hash_workers > 1:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.hash_workers)
+            chunksize = max(1, len(passwords) // (self.hash_workers * 4))
+            hashes = list(self.pool.map(get_password_hash, passwords, chunksize=chunksize))
+        else:
+            hashes = [get_password_hash(password) for password in passwords]
+        self.hash_seconds += time.perf_counter() - started
+        return hashes
+
+    # --- departments
+
+    def departments_batch(self, conn: Connection, batch: List[dict]) -> int:
+        rows = []
+        for row in batch:
+            name = (row.get("name") or "").strip()
+            if not name:
+                self.skip("department without a name")
+                continue
+            rows.append({"name": name, "description": row.get("description")})
+        inserted = write_rows(conn, Department.__table__, rows, conflict="name")
+        departments.invalidate()
+        return inserted
+
+    # --- users
+
+    def users_batch(self, conn: Connection, batch: List[dict], seen: set) -> int:
+        candidates = []
+        for row in batch:
+            email = (row.get("email") or "").strip()
+            if not email or not row.get("name") or not (row.get("password") or row.get("password_hash")):
+                self.skip(f"user {email or '?'}: name, email and a password are required")
+                continue
+            if email in seen:
+                continue
+            seen.add(email)
+            candidates.append((email, row))
+
+        emails = [email for email, _ in candidates]
+        existing = set(conn.execute(select(User.email).where(User.email.in_(emails))).scalars()) if emails else set()
+        now = datetime.utcnow()
+        rows, plain = [], []
+        for email, row in candidates:
+            if email in existing:
+                continue
+            role_id = self.role_ids.get(row.get("role") or "user")
+            if role_id is None:
+                self.skip(f"user {email}: unknown role {row.get('role')!r}")
+                continue
+            created_at = _datetime(row.get("created_at"), now)
+            rows.append({
+                "name": row["name"],
+                "email": email,
+                "phone": row.get("phone"),
+                "password": row.get("password_hash"),
+                "address": row.get("address"),
+                "age": int(row["age"]) if row.get("age") not in (None, "") else None,
+                "gender": row.get("gender"),
+                "role_id": role_id,
+                "department_id": self.department_ids[row["department"].strip()] if row.get("department") else None,
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+            if not row.get("password_hash"):
+                plain.append((len(rows) - 1, row["password"]))
+
+        for (index, _), hashed in zip(plain, self.hash_passwords([password for _, password in plain])):
+            rows[index]["password"] = hashed
+        return write_rows(conn, User.__table__, rows, conflict="email")
+
+    # --- complaints
+
+    def complaints_batch(self, conn: Connection, batch: List[dict]) -> int:
+        emails = {row["user_email"].strip() for row in batch if row.get("user_email")}
+        user_ids = dict(conn.execute(select(User.email, User.id).where(User.email.in_(emails))).all()) if emails else {}
+        now = datetime.utcnow()
+        rows = []
+        for row in batch:
+            user_id = int(row["user_id"]) if row.get("user_id") else user_ids.get((row.get("user_email") or "").strip())
+            if user_id is None:
+                self.skip(f"complaint {row.get('title')!r}: unknown user {row.get('user_email')!r}")
+                continue
+            if not row.get("department") or not row.get("title") or not row.get("description"):
+                self.skip(f"complaint {row.get('title')!r}: department, title and description are required")
+                continue
+            status = row.get("status") or "pending"
+            if status not in ComplaintStatus.__members__:
+                self.skip(f"complaint {row.get('title')!r}: unknown status {status!r}")
+                continue
+            created_at = _datetime(row.get("created_at"), now)
+            rows.append({
+                "user_id": user_id,
+                "department_id": self.department_ids[row["department"].strip()],
+                "title": row["title"],
+                "description": row["description"],
+                "location": row.get("location"),
+                "district": row.get("district"),
+                "subcategory": row.get("subcategory"),
+                "status": ComplaintStatus[status],
+                "admin_response": row.get("admin_response"),
+                "created_at": created_at,
+                "updated_at": _datetime(row.get("updated_at"), created_at),
+            })
+        inserted = write_rows(conn, Complaint.__table__, rows)
+        # COPY/executemany bypass the ORM events that keep the per-user counters
+        user_stats.rebuild(conn, {row["user_id"] for row in rows})
+        return inserted
+
+    def run(self, table: str, rows: Iterable[dict]):
+        seen: set = set()
+        for batch in batched(rows, self.batch_size):
+            self.read += len(batch)
+            if table != "departments":
+                self.add_missing_departments(batch)
+            with engine.begin() as conn:
+                if table == "departments":
+                    self.inserted += self.departments_batch(conn, batch)
+                elif table == "users":
+                    self.inserted += self.users_batch(conn, batch, seen)
+                else:
+                    self.inserted += self.complaints_batch(conn, batch)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load departments, users or complaints from CSV/NDJSON")
+    parser.add_argument("table", choices=["departments", "users", "complaints"])
+    parser.add_argument("path", help="input file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--hash-workers", type=int, default=os.cpu_count() or 1,
+                        help="processes hashing passwords (default: CPU count)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    importer = Importer(args.batch_size, args.hash_workers)
+    started = time.perf_counter()
+    try:
+        Base.metadata.create_all(bind=engine)
+        importer.load_maps()
+        importer.run(args.table, read_rows(args.path, fmt))
+    except Exception as e:
+        print(f"Error importing {args.table}: {e} ({importer.inserted} rows committed before the failing batch)")
+        sys.exit(1)
+    finally:
+        importer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"[OK] Imported {importer.inserted} of {importer.read} {args.table} in {elapsed:.1f}s "
+          f"({importer.read / elapsed:.0f} rows/s read, {importer.inserted / elapsed:.0f} rows/s inserted)")
+    existing = importer.read - importer.inserted - importer.skipped
+    print(f"  {importer.skipped} invalid rows skipped, {existing} already present or repeated")
+    if args.table == "users":
+        print(f"  password hashing: {importer.hash_seconds:.1f}s with {args.hash_workers} process(es)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Garbage collection of orphaned upload files
+
+Usage:
+    python gc_uploads.py                          # dry run: report orphans and reclaimable bytes
+    python gc_uploads.py --delete                 # remove orphans in batches
+    python gc_uploads.py --delete --grace-hours 48 --batch-size 200 --pause 0.5
+
+A stored file (local uploads/ or the S3 bucket, see app/storage.py) is an orphan
+when no row references it: not users.profile_picture, nor complaints.image_path /
+voice_path / voice_original_path. Orphans come from replaced profile pictures,
+transcoded voice recordings, uploads whose complaint insert failed, and direct
+uploads (incoming/) that were never attached to a complaint. Files younger than the grace period are never touched,
+so uploads whose transaction has not committed yet (and in-progress `.part` files)
+are safe. Each batch is re-checked against the database just before it is deleted.
+Run from the backend directory, e.g. daily from cron.
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import select
+from app.database import engine
+from app.models import Complaint, User
+from app.storage import key_from_url, storage, url_for_key
+
+UPLOAD_DIRS = ("profile_pictures", "complaints", "voice_recordings", "incoming")
+REFERENCE_COLUMNS = (
+    User.profile_picture,
+    Complaint.image_path,
+    Complaint.voice_path,
+    Complaint.voice_original_path,
+)
+
+
+def referenced_paths(conn) -> Set[str]:
+    referenced = set()
+    for column in REFERENCE_COLUMNS:
+        result = conn.execution_options(stream_results=True, yield_per=5000).execute(
+            select(column).where(column.isnot(None))
+        )
+        for (stored,) in result:
+            relative = key_from_url(stored)
+            if relative:
+                referenced.add(relative)
+    return referenced
+
+
+def still_referenced(conn, batch: List[str]) -> Set[str]:
+    """Which of `batch` (relative paths) are referenced right now"""
+    urls = [url_for_key(relative) for relative in batch]
+    found = set()
+    for column in REFERENCE_COLUMNS:
+        for (stored,) in conn.execute(select(column).where(column.in_(urls))):
+            found.add(key_from_url(stored))
+    return found
+
+
+def scan_uploads(grace_seconds: float) -> Iterable[Tuple[str, int, bool]]:
+    """Yield (key, size, old enough) for every stored file in the upload dirs"""
+    cutoff = time.time() - grace_seconds
+    for directory in UPLOAD_DIRS:
+        for stored in storage.iter_objects(directory + "/"):
+            yield stored.key, stored.size, stored.modified < cutoff
+
+
+def delete_batch(conn, batch: List[Tuple[str, int]]) -> Tuple[int, int]:
+    """Delete the batch's files that are still unreferenced; returns (files, bytes)"""
+    keep = still_referenced(conn, [key for key, _ in batch])
+    doomed = [(key, size) for key, size in batch if key not in keep]
+    storage.delete_many([key for key, _ in doomed])
+    return len(doomed), sum(size for _, size in doomed)
+
+
+def _human(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and remove upload files no row references")
+    parser.add_argument("--delete", action="store_true", help="remove orphans (default is a dry run)")
+    parser.add_argument("--grace-hours", type=float, default=24, help="never touch files newer than this")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--verbose", action="store_true", help="list every orphan")
+    args = parser.parse_args()
+
+    try:
+        with engine.connect() as conn:
+            referenced = referenced_paths(conn)
+
+            orphans: List[Tuple[str, int]] = []
+            orphan_bytes: Dict[str, int] = defaultdict(int)
+            orphan_count: Dict[str, int] = defaultdict(int)
+            total_files = recent = 0
+            for relative, size, old_enough in scan_uploads(args.grace_hours * 3600):
+                total_files += 1
+                if relative in referenced:
+                    continue
+                if not old_enough:
+                    recent += 1
+                    continue
+                directory = relative.split("/", 1)[0]
+                orphans.append((relative, size))
+                orphan_bytes[directory] += size
+                orphan_count[directory] += 1
+                if args.verbose:
+                    print(f"  orphan {relative} ({_human(size)})")
+
+            print(f"Scanned {total_files} files in {storage.name} storage, {len(referenced)} referenced paths")
+            for directory in UPLOAD_DIRS:
+                print(f"  {directory:<18} {orphan_count[directory]:>7} orphans  {_human(orphan_bytes[directory]):>10}")
+            print(f"Reclaimable: {len(orphans)} files, {_human(sum(orphan_bytes.values()))}"
+                  f" ({recent} unreferenced files inside the {args.grace_hours:g}h grace period skipped)")
+
+            if not args.delete:
+                print("Dry run; pass --delete to remove them")
+                return
+
+            deleted = freed = 0
+            for start in range(0, len(orphans), args.batch_size):
+                files, size = delete_batch(conn, orphans[start:start + args.batch_size])
+                deleted += files
+                freed += size
+                if args.pause and start + args.batch_size < len(orphans):
+                    time.sleep(args.pause)
+            print(f"[OK] Deleted {deleted} files, freed {_human(freed)}")
+    except Exception as e:
+        print(f"Error collecting uploads: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Monthly range partitioning for the complaints table (PostgreSQL only)
+
+Usage:
+    python manage_partitions.py convert          # one-time: turn `complaints` into a partitioned table
+    python manage_partitions.py ensure --ahead 3 # create partitions for this month + 3 months ahead
+    python manage_partitions.py list             # show partitions and approximate row counts
+
+`complaints` stays the table the ORM reads and writes; Postgres routes rows to the
+monthly partition by `created_at` and prunes partitions for time-bounded queries.
+Run `ensure` from cron (e.g. daily) so inserts never fall into the default partition.
+
+Note: Postgres cannot point a foreign key at `complaints.id` once the primary key
+becomes (id, created_at), so `convert` drops the FKs from complaint_messages and
+complaint_status_history. The ORM relationships and delete cascades still apply.
+"""
+import argparse
+import sys
+from datetime import date, datetime
+
+from sqlalchemy import text
+from app.database import engine
+from app.config import settings
+
+PARENT = "complaints"
+DEFAULT_PARTITION = "complaints_default"
+
+
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, months: int) -> date:
+    month_index = d.year * 12 + (d.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"complaints_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"
+    ), {"t": PARENT}).scalar())
+
+
+def create_month_partition(conn, month: date) -> bool:
+    """Create the partition for `month` if missing. Returns True if it was created.
+
+    Rows that already landed in the default partition for that month are moved
+    into the new partition in the same transaction.
+    """
+    name = _partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar():
+        return False
+
+    start, end = month, _add_months(month, 1)
+    params = {"start": start, "end": end}
+    has_default = conn.execute(text("SELECT to_regclass(:n)"), {"n": DEFAULT_PARTITION}).scalar()
+    stray_rows = has_default and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+    ), params).scalar()
+
+    if stray_rows:
+        conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}"))
+
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+    if stray_rows:
+        conn.execute(text(
+            f"INSERT INTO {PARENT} SELECT * FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= :start AND created_at < :end"
+        ), params)
+        conn.execute(text(
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end"
+        ), params)
+        conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+    return True
+
+
+def ensure_partitions(conn, months_ahead: int) -> int:
+    """Create partitions from the current month through `months_ahead` months ahead"""
+    this_month = _month_start(datetime.utcnow().date())
+    created = 0
+    for offset in range(months_ahead + 1):
+        month = _add_months(this_month, offset)
+        if create_month_partition(conn, month):
+            print(f"[OK] Created partition {_partition_name(month)}")
+            created += 1
+    return created
+
+
+def convert_to_partitioned(conn, months_ahead: int):
+    """Rebuild `complaints` as a table partitioned by month on created_at"""
+    if is_partitioned(conn):
+        print("[OK] complaints is already partitioned")
+        return
+
+    # The partition key is part of the primary key, so it cannot be NULL
+    conn.execute(text(f"UPDATE {PARENT} SET created_at = now() WHERE created_at IS NULL"))
+    first, last = conn.execute(text(f"SELECT min(created_at), max(created_at) FROM {PARENT}")).one()
+
+    conn.execute(text(f"ALTER TABLE {PARENT} RENAME TO complaints_legacy"))
+    conn.execute(text("ALTER TABLE complaints_legacy RENAME CONSTRAINT complaints_pkey TO complaints_legacy_pkey"))
+    for index_name in ("ix_complaints_id", "ix_complaints_user_id", "ix_complaints_department_id"):
+        conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    child_fks = conn.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = 'complaints_legacy'::regclass"
+    )).all()
+    for table_name, constraint_name in child_fks:
+        conn.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{constraint_name}"'))
+        print(f"[OK] Dropped foreign key {table_name}.{constraint_name}")
+
+    conn.execute(text(
+        f"CREATE TABLE {PARENT} (LIKE complaints_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text(f"ALTER TABLE {PARENT} ALTER COLUMN created_at SET DEFAULT now()"))
+    conn.execute(text(f"ALTER TABLE {PARENT} ADD PRIMARY KEY (id, created_at)"))
+    # Keep the id sequence alive when the legacy table is dropped
+    conn.execute(text("ALTER SEQUENCE complaints_id_seq OWNED BY complaints.id"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+    # Partitions for the existing data range plus the months ahead
+    month = _month_start((first or datetime.utcnow()).date())
+    last_month = _month_start((last or datetime.utcnow()).date())
+    while month <= last_month:
+        create_month_partition(conn, month)
+        month = _add_months(month, 1)
+    ensure_partitions(conn, months_ahead)
+
+    moved = conn.execute(text(f"INSERT INTO {PARENT} SELECT * FROM complaints_legacy")).rowcount
+    conn.execute(text("DROP TABLE complaints_legacy"))
+
+    conn.execute(text(f"ALTER TABLE {PARENT} ADD CONSTRAINT complaints_user_id_fkey FOREIGN KEY (user_id) REFERENCES users(id)"))
+    conn.execute(text(f"ALTER TABLE {PARENT} ADD CONSTRAINT complaints_department_id_fkey FOREIGN KEY (department_id) REFERENCES departments(id)"))
+    conn.execute(text(f"CREATE INDEX ix_complaints_id ON {PARENT} (id)"))
+    conn.execute(text(f"CREATE INDEX ix_complaints_user_id ON {PARENT} (user_id)"))
+    conn.execute(text(f"CREATE INDEX ix_complaints_department_id ON {PARENT} (department_id)"))
+
+    print(f"[OK] Converted complaints to a partitioned table ({moved} rows moved)")
+
+
+def list_partitions(conn):
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname"
+    ), {"t": PARENT}).all()
+    if not rows:
+        print("complaints has no partitions")
+    for name, bound, estimate in rows:
+        print(f"{name:<28} {bound:<70} ~{max(estimate, 0)} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of the complaints table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("convert", "ensure"):
+        p = sub.add_parser(name)
+        p.add_argument("--ahead", type=int, default=settings.COMPLAINT_PARTITION_MONTHS_AHEAD,
+                       help="number of future months to create partitions for")
+    sub.add_parser("list")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print(f"Partitioning requires PostgreSQL (current database: {engine.dialect.name})")
+        sys.exit(1)
+
+    try:
+        with engine.begin() as conn:
+            if args.command == "convert":
+                convert_to_partitioned(conn, args.ahead)
+            elif args.command == "ensure":
+                if not is_partitioned(conn):
+                    print("complaints is not partitioned yet; run `convert` first")
+                    sys.exit(1)
+                created = ensure_partitions(conn, args.ahead)
+                print(f"[OK] {created} partition(s) created")
+            else:
+                list_partitions(conn)
+    except Exception as e:
+        print(f"Error managing partitions: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Move concatenated admin responses into complaint_messages
+
+Usage:
+    python migrate_admin_responses.py                     # dry run: count what would be split
+    python migrate_admin_responses.py --apply             # write the messages
+    python migrate_admin_responses.py --apply --batch-size 200
+
+Until now every admin reply was appended to complaints.admin_response
+("[C-Admin]: ...\\n\\n[CM-Admin]: ..."), so busy complaints carried an ever-growing
+text column. Replies are now ComplaintMessage rows with kind 'admin_response' and
+the column keeps only the latest one (see app/admin_responses.py).
+
+For each complaint with an admin_response and no admin_response messages yet, the
+text is split at every "[C-Admin]: " / "[CM-Admin]: " note; text before the first
+label was written by the old C-Admin update, which overwrote the column without one.
+Each part becomes a message from the admin in updated_by_admin when their role
+matches the label, otherwise from the first admin with that role (the complaint's
+department first for CM-Admin). Messages get the complaint's last update time, and
+updated_at itself is left unchanged. Complaints already migrated are skipped, so the
+script can be rerun. Run from the backend directory.
+"""
+import argparse
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.orm import Session
+
+from app.admin_responses import ADMIN_RESPONSE, C_ADMIN_LABEL, CM_ADMIN_LABEL, format_admin_response
+from app.database import SessionLocal
+from app.models import Complaint, ComplaintMessage, User
+from app.registry import roles
+from app.startup import ensure_added_columns
+
+LABEL_ROLES = {C_ADMIN_LABEL: "c_admin", CM_ADMIN_LABEL: "cm_admin"}
+NOTE_SPLIT = re.compile(r"\n\n(?=\[(?:CM-Admin|C-Admin)\]: )")
+NOTE_LABEL = re.compile(r"\[(CM-Admin|C-Admin)\]: ")
+
+
+def split_notes(admin_response: str) -> List[Tuple[str, str]]:
+    """(label, text) for every note in a concatenated admin_response"""
+    notes = []
+    for part in NOTE_SPLIT.split(admin_response):
+        match = NOTE_LABEL.match(part)
+        if match:
+            notes.append((match.group(1), part[match.end():]))
+        elif part.strip():
+            notes.append((C_ADMIN_LABEL, part))
+    return notes
+
+
+class SenderResolver:
+    """Picks the admin (user id) to attribute a note to; ids stay valid across batches"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._by_email: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._fallback: Dict[Tuple[int, Optional[int]], Optional[int]] = {}
+
+    def _user_by_email(self, email: str) -> Optional[Tuple[int, int]]:
+        if email not in self._by_email:
+            row = self.db.execute(select(User.id, User.role_id).where(User.email == email)).first()
+            self._by_email[email] = tuple(row) if row else None
+        return self._by_email[email]
+
+    def _first_with_role(self, role_id: int, department_id: Optional[int]) -> Optional[int]:
+        key = (role_id, department_id)
+        if key not in self._fallback:
+            query = select(User.id).where(User.role_id == role_id)
+            if department_id is not None:
+                query = query.where(User.department_id == department_id)
+            self._fallback[key] = self.db.execute(query.order_by(User.id).limit(1)).scalar()
+        return self._fallback[key]
+
+    def sender_for(self, complaint: Complaint, label: str) -> Optional[int]:
+        role_id = roles.id_for(self.db, LABEL_ROLES[label])
+        if role_id is None:
+            return None
+        if complaint.updated_by_admin:
+            user = self._user_by_email(complaint.updated_by_admin)
+            if user is not None and user[1] == role_id:
+                return user[0]
+        if label == CM_ADMIN_LABEL:
+            sender_id = self._first_with_role(role_id, complaint.department_id)
+            if sender_id is not None:
+                return sender_id
+        return self._first_with_role(role_id, None)
+
+
+def pending_batch(db: Session, after_id: int, batch_size: int) -> List[Complaint]:
+    """Complaints with an admin_response that have no admin_response messages yet"""
+    migrated = exists().where(
+        ComplaintMessage.complaint_id == Complaint.id,
+        ComplaintMessage.kind == ADMIN_RESPONSE
+    )
+    return list(db.execute(
+        select(Complaint)
+        .where(Complaint.id > after_id, Complaint.admin_response.isnot(None), Complaint.admin_response != "", ~migrated)
+        .order_by(Complaint.id)
+        .limit(batch_size)
+    ).scalars())
+
+
+def plan_messages(resolver: SenderResolver, complaint: Complaint) -> Optional[List[Tuple[str, str, int]]]:
+    """(label, text, sender id) per note, or None when a note has no admin to attribute it to"""
+    notes = split_notes(complaint.admin_response)
+    planned = [(label, text, resolver.sender_for(complaint, label)) for label, text in notes]
+    if not planned or any(sender_id is None for _, _, sender_id in planned):
+        return None
+    return planned
+
+
+def migrate_complaint(db: Session, complaint: Complaint, planned: List[Tuple[str, str, int]]):
+    created_at = complaint.updated_at or complaint.created_at
+    for label, text, sender_id in planned:
+        db.add(ComplaintMessage(
+            complaint_id=complaint.id, sender_id=sender_id, message=text,
+            kind=ADMIN_RESPONSE, created_at=created_at
+        ))
+    label, text, _ = planned[-1]
+    # Core UPDATE so updated_at keeps its value instead of taking onupdate
+    db.execute(
+        update(Complaint)
+        .where(Complaint.id == complaint.id)
+        .values(
+            admin_response=format_admin_response(label, text),
+            updated_at=Complaint.updated_at,
+            version=Complaint.version + 1  # so a concurrent ORM update of this row gets 409
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split complaints.admin_response into complaint messages")
+    parser.add_argument("--apply", action="store_true", help="write the messages (default is a dry run)")
+    parser.add_argument("--batch-size", type=int, default=500, help="complaints per transaction")
+    args = parser.parse_args()
+
+    try:
+        ensure_added_columns()
+        db = SessionLocal()
+        try:
+            resolver = SenderResolver(db)
+            complaints = messages = skipped = 0
+            after_id = 0
+            while True:
+                batch = pending_batch(db, after_id, args.batch_size)
+                if not batch:
+                    break
+                after_id = batch[-1].id
+                for complaint in batch:
+                    planned = plan_messages(resolver, complaint)
+                    if planned is None:
+                        skipped += 1
+                        print(f"Warning: complaint {complaint.id} skipped, no admin to attribute its responses to")
+                        continue
+                    if args.apply:
+                        migrate_complaint(db, complaint, planned)
+                    complaints += 1
+                    messages += len(planned)
+                if args.apply:
+                    db.commit()
+                db.expunge_all()
+
+            if not args.apply:
+                print(f"Would split {complaints} complaints into {messages} messages ({skipped} skipped)")
+                print("Dry run; pass --apply to write them")
+                return
+            print(f"[OK] Split {complaints} complaints into {messages} messages ({skipped} skipped)")
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Error migrating admin responses: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
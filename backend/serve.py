@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Production server: Gunicorn managing uvicorn workers (Linux/macOS)
+
+Usage:
+    python serve.py                               # one worker per available CPU on 0.0.0.0:8000
+    python serve.py --workers 4 --bind 0.0.0.0:8001
+    python serve.py --preload                     # import the app once in the master
+
+Startup work (create tables, schema patches, role/admin seeding; see app/startup.py)
+runs once in a separate process before the workers start, and again on every reload.
+Workers start with SKIP_STARTUP_TASKS=true, so they only import the app.
+
+Signals to the master process (see --pid):
+    HUP          graceful reload: new workers load the current code, old workers finish
+                 their in-flight requests and background jobs (up to --graceful-timeout),
+                 clean up (app/lifecycle.py) and exit
+    TTIN / TTOU  add / remove one worker
+    TERM         graceful shutdown
+
+With --preload the app is imported in the master before forking, which saves memory
+and start-up time, but HUP then restarts workers with the code already loaded. To
+deploy new code with --preload, send USR2 (starts a new master next to the old one),
+then QUIT to the old master.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication  # type: ignore
+    from uvicorn.workers import UvicornWorker
+except ImportError:
+    print("gunicorn is not installed: pip install gunicorn==21.2.0")
+    sys.exit(1)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Part of --graceful-timeout kept for the app's shutdown cleanup once requests have
+# drained; must exceed SHUTDOWN_DRAIN_SECONDS (app/lifecycle.py)
+CLEANUP_RESERVE_SECONDS = 10
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: scheduler affinity, capped by a cgroup v2 quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def run_startup_tasks() -> bool:
+    """Run app/startup.py in a child process; without --preload the master must not
+    import the app, or workers started by HUP would inherit the old code"""
+    result = subprocess.run([sys.executable, "-m", "app.startup"], cwd=BACKEND_DIR)
+    return result.returncode == 0
+
+
+def on_reload(server):
+    if not run_startup_tasks():
+        print("Warning: startup tasks failed during reload")
+
+
+def post_fork(server, worker):
+    # With --preload the engine's pool was created in the master; each worker must
+    # open its own connections instead of sharing the inherited sockets
+    database = sys.modules.get("app.database")
+    if database is not None:
+        database.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess  # type: ignore
+        multiprocess.mark_process_dead(worker.pid)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """Stops waiting for in-flight requests in time for the lifespan shutdown to run
+    before Gunicorn kills the worker at --graceful-timeout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - CLEANUP_RESERVE_SECONDS)
+
+
+class ServeApplication(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API under Gunicorn with uvicorn workers")
+    parser.add_argument("--bind", default="0.0.0.0:8000", help="address to listen on (default: 0.0.0.0:8000)")
+    parser.add_argument("--workers", type=int,
+                        default=int(os.environ.get("WEB_CONCURRENCY") or available_cpus()),
+                        help="worker processes (default: WEB_CONCURRENCY or the available CPUs)")
+    parser.add_argument("--preload", action="store_true", help="import the app in the master before forking")
+    parser.add_argument("--timeout", type=int, default=60, help="restart a worker silent for this many seconds")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds workers get to finish in-flight requests on reload/shutdown")
+    parser.add_argument("--keep-alive", type=int, default=5, help="seconds to hold idle keep-alive connections")
+    parser.add_argument("--max-requests", type=int, default=0,
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--pid", help="write the master pid to this file")
+    parser.add_argument("--access-log", action="store_true", help="log every request to stdout")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        print("--workers must be at least 1")
+        sys.exit(1)
+
+    # Before gunicorn starts: with --preload the master imports the app right away
+    if not run_startup_tasks():
+        print("Startup tasks failed; not starting workers")
+        sys.exit(1)
+
+    # Inherited by every worker (and a preloading master): the tasks already ran
+    os.environ["SKIP_STARTUP_TASKS"] = "true"
+    os.chdir(BACKEND_DIR)
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "worker_class": "serve.DrainingUvicornWorker",
+        "preload_app": args.preload,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": args.keep_alive,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "pidfile": args.pid,
+        "accesslog": "-" if args.access_log else None,
+        "loglevel": args.log_level,
+        "on_reload": on_reload,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+    print(f"[OK] Starting {args.workers} worker(s) on {args.bind}")
+    ServeApplication(options).run()
+
+
+if __name__ == "__main__":
+    main()
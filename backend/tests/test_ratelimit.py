@@ -0,0 +1,46 @@
+"""
+Rate limiting and load shedding middleware (app/middleware/ratelimit.py)
+Run from the backend directory: python -m pytest tests
+"""
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from starlette.testclient import TestClient
+
+from app.middleware.ratelimit import DEFAULT_POLICY, ConcurrencyLimitMiddleware, RateLimitMiddleware
+
+
+def _ok(request):
+    return PlainTextResponse("ok")
+
+
+def _client() -> TestClient:
+    app = Starlette(routes=[
+        Route("/api/complaints/", _ok),
+        Mount("/uploads", routes=[Route("/{path:path}", _ok)]),
+    ])
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(ConcurrencyLimitMiddleware, max_in_flight=100)
+    return TestClient(app)
+
+
+def test_api_requests_are_limited_per_ip():
+    client = _client()
+    codes = [client.get("/api/complaints/").status_code for _ in range(DEFAULT_POLICY.burst + 5)]
+    assert codes[:DEFAULT_POLICY.burst] == [200] * DEFAULT_POLICY.burst
+    assert codes[-1] == 429
+
+
+def test_media_is_not_rate_limited():
+    client = _client()
+    for _ in range(DEFAULT_POLICY.burst * 3):
+        response = client.get("/uploads/complaints/complaint_1_1_ab12cd34.webp", headers={"Range": "bytes=0-99"})
+        assert response.status_code == 200
+
+
+def test_media_bypasses_load_shedding():
+    shedding = ConcurrencyLimitMiddleware(_client().app, max_in_flight=1)
+    shedding.in_flight = 1  # the worker is already full
+    client = TestClient(shedding)
+    assert client.get("/uploads/complaints/complaint_1_1_ab12cd34.webp").status_code == 200
+    assert client.get("/api/complaints/").status_code == 503